@@ -0,0 +1,145 @@
+# This module exports the whole answer history into Parquet files for analysis (pandas, pyarrow, ...).
+# Requires the optional dependency pyarrow: pip install .[export]
+# Run it from the project directory: python -m Database.answer_export <output directory> [--full]
+import argparse
+import json
+import os
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ----------------------------------------------------------------------------------------------  Import custom modules:
+from Database import user_database
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+export_chunk_size = 50000  # Number of answers held in memory at once
+export_state_file = "_export_state.json"  # File in the output directory that remembers the last exported answer
+
+# Columns of the exported files (answers joined with their score and user). The test form is not a column of the
+# files, readers of the export get it from the "TestForm=<form>" directory of the partition
+export_schema = pa.schema([
+    ('AnswerID', pa.int64()),
+    ('Question', pa.string()),
+    ('Answer', pa.string()),
+    ('AnswerType', pa.string()),
+    ('AbsoluteTime', pa.float64()),
+    ('RelativeTime', pa.float64()),
+    ('ScoreID', pa.int64()),
+    ('Date', pa.timestamp('ms')),
+    ('UserID', pa.int64()),
+    ('Firstname', pa.string()),
+    ('Surname', pa.string()),
+    ('Age', pa.int64()),
+    ('Profession', pa.string()),
+    ('Nationality', pa.string()),
+])
+
+export_query = """SELECT a.CustomAnswerID, a.Question, a.Answer, a.AnswerType, a.AbsoluteTime, a.RelativeTime,
+                  a.ScoreID, s.TestForm, s.Date, s.UserID, u.Firstname, u.Surname, u.Age, u.Profession, u.Nationality
+                  FROM AnswerTable a
+                  JOIN ScoreTable s ON s.CustomScoreID = a.ScoreID
+                  JOIN UserTable u ON u.CustomUserID = s.UserID
+                  WHERE a.CustomAnswerID > ?
+                  ORDER BY a.CustomAnswerID"""
+test_form_column = 7  # Index of the test form in the rows of the export query, it is written only as the partition
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+def _load_last_exported_answer_id(output_dir):
+    state_path = os.path.join(output_dir, export_state_file)
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as state_file:
+        return json.load(state_file)['last_answer_id']
+
+
+def _save_last_exported_answer_id(output_dir, answer_id):
+    state_path = os.path.join(output_dir, export_state_file)
+    with open(state_path, 'w') as state_file:
+        json.dump({'last_answer_id': answer_id}, state_file)
+
+
+# Directory of the partition the answer belongs to (partitioned by test form and month of the score)
+def _partition(test_form, date):
+    month = datetime.fromtimestamp(date / 1000).strftime("%Y-%m") if isinstance(date, int) else "unknown"
+    test_form = str(test_form).replace("/", "_").replace("\\", "_")
+    return os.path.join(f"TestForm={test_form}", f"Month={month}")
+
+
+# Convert rows of the export query into a pyarrow table (without the test form of the partition)
+def _rows_to_table(rows):
+    columns = [column for index, column in enumerate(zip(*rows)) if index != test_form_column]
+    arrays = []
+    for column, field in zip(columns, export_schema):
+        # SQLite does not enforce column types (age is free text in the menu, old dates are text)
+        if pa.types.is_string(field.type):
+            column = [None if value is None else str(value) for value in column]
+        elif not pa.types.is_floating(field.type):
+            column = [value if isinstance(value, int) else None for value in column]
+        arrays.append(pa.array(column, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=export_schema)
+
+
+def export_answer_history(output_dir, incremental=True, chunk_size=export_chunk_size):
+    """
+    Streams answers joined with their score and user into Parquet files partitioned by test form and month:
+    <output_dir>/TestForm=<form>/Month=<YYYY-MM>/part-<first answer ID>.parquet
+    The test form and month are columns of the partition directories, pyarrow.parquet.read_table(output_dir) reads
+    the whole export with them.
+
+    Only "chunk_size" answers are held in memory at once. An incremental export writes only the answers added since
+    the last export into the output directory (answers are ordered by their CustomAnswerID). Running the same export
+    again after a failure overwrites the files of the failed run.
+
+    :param output_dir: Directory with the exported files.
+    :param incremental: Export only new answers, False exports the whole history into an empty directory.
+    :param chunk_size: Number of answers fetched and written at once.
+    :return: Number of exported answers.
+    """
+    last_exported_answer_id = _load_last_exported_answer_id(output_dir)
+    if not incremental and last_exported_answer_id is not None:
+        raise FileExistsError(f"{output_dir} already contains an export, use an empty directory for a full export")
+    if last_exported_answer_id is None:
+        last_exported_answer_id = 0
+
+    file_name = f"part-{last_exported_answer_id + 1:09d}.parquet"
+    writers = {}  # Open Parquet file of every partition found in this export
+    exported_answers = 0
+
+    try:
+        for rows in user_database.stream_rows(export_query, (last_exported_answer_id,), batch_size=chunk_size):
+            # Split the chunk into partitions
+            partitions = {}
+            for row in rows:
+                partitions.setdefault(_partition(row[test_form_column], row[test_form_column + 1]), []).append(row)
+
+            for partition, partition_rows in partitions.items():
+                if partition not in writers:
+                    os.makedirs(os.path.join(output_dir, partition), exist_ok=True)
+                    writers[partition] = pq.ParquetWriter(os.path.join(output_dir, partition, file_name),
+                                                          export_schema)
+                writers[partition].write_table(_rows_to_table(partition_rows))
+
+            exported_answers += len(rows)
+            last_exported_answer_id = rows[-1][0]
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Remember the last exported answer only after every file is written
+    os.makedirs(output_dir, exist_ok=True)
+    _save_last_exported_answer_id(output_dir, last_exported_answer_id)
+    return exported_answers
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the answer history into partitioned Parquet files.")
+    parser.add_argument("output_dir", help="directory with the exported files")
+    parser.add_argument("--full", action="store_true", help="export the whole history into an empty directory")
+    arguments = parser.parse_args()
+
+    user_database.connect()
+    number_of_answers = export_answer_history(arguments.output_dir, incremental=not arguments.full)
+    print(f"Exported {number_of_answers} answers into {arguments.output_dir}")
@@ -0,0 +1,117 @@
+import queue
+import threading
+
+# ----------------------------------------------------------------------------------------------  Import custom modules:
+from Database import user_database
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+max_batch_size = 256  # Maximum number of records written to the User Database in one transaction
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class AnswerRecorder:
+    """
+    Write-behind recorder of test answers.
+    The test loops only put records into an in-memory queue and return immediately.
+    A background writer thread takes the records from the queue and writes them into the User Database in batches
+    (one transaction per batch), so no commit lands between a key press and the next frame.
+
+    The methods mirror user_database.insert_into_answer_table(), user_database.update_answer() and
+    user_database.update_last_answer(), including their return values, so they can be used as a drop-in
+    replacement in the test loops.
+
+    A record which cannot be written is skipped (the other records of its batch are written), the first error is
+    raised by the next flush() or close(), so the test does not end as if every answer was recorded.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._error = None  # First error of the writer thread, raised by flush() and close()
+        self._writer = threading.Thread(target=self._write_records, name="AnswerRecorder", daemon=True)
+        self._writer.start()
+
+    def insert_into_answer_table(self, question, answer, answer_type, absolute_time, relative_time, score_id):
+        if isinstance(score_id, int):
+            self._queue.put((user_database.insert_into_answer_table,
+                             (question, answer, answer_type, absolute_time, relative_time, score_id)))
+            return answer_type
+        else:
+            return
+
+    def update_answer(self, question, answer, answer_type, absolute_time, relative_time, answer_id):
+        if isinstance(answer_id, int):
+            self._queue.put((user_database.update_answer,
+                             (question, answer, answer_type, absolute_time, relative_time, answer_id)))
+            return answer_type
+        else:
+            return
+
+    def update_last_answer(self, question, answer, answer_type, absolute_time, relative_time, score_id):
+        if isinstance(score_id, int):
+            # Records are written in the order they were queued, the latest answer of the score is already written
+            self._queue.put((user_database.update_last_answer,
+                             (question, answer, answer_type, absolute_time, relative_time, score_id)))
+            return answer_type
+        else:
+            return
+
+    def flush(self):
+        """Blocks until every queued record is written into the User Database, raises the error of a failed record."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Flushes the queue and stops the writer thread, raises the error of a failed record."""
+        if self._writer.is_alive():
+            self._queue.put(None)  # Sentinel that stops the writer thread
+            self._writer.join()
+        self._raise_error()
+
+    # Raise the first error of the writer thread (once)
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    # Method running in the writer thread
+    def _write_records(self):
+        # The writer thread has its own connection, tune it for low write latency
+        user_database.apply_pragma_profile("recording")
+
+        running = True
+        while running:
+            # Wait for the first record, then take whatever else is already waiting in the queue
+            batch = [self._queue.get()]
+            while len(batch) < max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [record for record in batch if record is not None]
+            running = len(records) == len(batch)
+            try:
+                with user_database.transaction():
+                    for function, arguments in records:
+                        function(*arguments)
+            except Exception:
+                # The batch was rolled back, its records are written one by one so only the failing ones are lost
+                self._write_one_by_one(records)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        user_database.close_connection()
+
+    # Writes every record in its own transaction, a failing record is skipped and its error kept for flush()/close()
+    def _write_one_by_one(self, records):
+        for function, arguments in records:
+            try:
+                with user_database.transaction():
+                    function(*arguments)
+            except Exception as error:
+                # Keep the writer alive, losing the record is better than freezing the test
+                print(f"Recording of an answer failed: {error}")
+                if self._error is None:
+                    self._error = error
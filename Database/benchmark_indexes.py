@@ -0,0 +1,99 @@
+# This module measures how the latency of the score queries scales with the size of the Answer Table.
+# Run it from the project directory: python -m Database.benchmark_indexes
+import os
+import random
+import time
+
+# ----------------------------------------------------------------------------------------------  Import custom modules:
+from Database import user_database
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+benchmark_database_name = "benchmark_database.db"  # Temporary database file (removed after the benchmark)
+answers_per_score = 180  # Number of answers of one score (length of the question set)
+table_sizes = (10 ** 4, 10 ** 5, 10 ** 6)  # Number of answers at which the queries are measured
+repetitions = 200  # Number of measured queries per table size
+
+# Queries used by the menu and the reports (the same query is measured with and without the indexes)
+benchmarked_queries = {
+    'answers of score': "SELECT rowid, * FROM AnswerTable {} WHERE ScoreID=?",
+    'answers of type': "SELECT * FROM AnswerTable {} WHERE ScoreID=? AND AnswerType = 'Correct'",
+    'count reactions': "SELECT COUNT(*) FROM AnswerTable {} WHERE ScoreID = ? AND NOT AnswerType = 'Missed'",
+    'scores of user': "SELECT rowid, * FROM ScoreTable {} WHERE UserID=?",
+}
+answer_types = ["Correct", "Correct", "Correct", "Incorrect", "Late", "Missed"]
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+def fill_database(number_of_answers, number_of_users=50):
+    """Adds scores (each with "answers_per_score" answers) until the Answer Table holds "number_of_answers" rows."""
+    with user_database.transaction() as c:
+        c.execute("SELECT COUNT(*) FROM UserTable")
+        if c.fetchone()[0] == 0:
+            c.executemany("""INSERT INTO UserTable (Firstname, Surname, Age, Profession, Nationality)
+             VALUES (?, ?, ?, ?, ?)""", [("Benchmark", str(user), 0, None, None) for user in range(number_of_users)])
+
+        c.execute("SELECT COUNT(*) FROM AnswerTable")
+        current_answers = c.fetchone()[0]
+
+        while current_answers < number_of_answers:
+            c.execute("INSERT INTO ScoreTable (TestForm, Date, UserID) VALUES (?, ?, ?)",
+                      ("Reactive", int(time.time() * 1000), random.randint(1, number_of_users)))
+            score_id = c.lastrowid
+            c.executemany("""INSERT INTO AnswerTable(Question, Answer, AnswerType, AbsoluteTime, RelativeTime, ScoreID)
+             VALUES (?, ?, ?, ?, ?, ?)""", [("WHITE", "w", random.choice(answer_types), index * 1.5,
+                                             random.uniform(300, 900), score_id)
+                                            for index in range(answers_per_score)])
+            current_answers += answers_per_score
+
+
+def measure_query(query, parameters):
+    """Returns the mean latency of the query in milliseconds."""
+    c = user_database.connect_to_user_db().cursor()
+    start = time.perf_counter()
+    for parameter in parameters:
+        c.execute(query, (parameter,)).fetchall()
+    return (time.perf_counter() - start) / len(parameters) * 1000
+
+
+def query_plan(query):
+    """Returns the query plan that SQLite chooses for the query."""
+    c = user_database.connect_to_user_db().cursor()
+    plan = c.execute(f"EXPLAIN QUERY PLAN {query}", (1,)).fetchall()
+    return "; ".join(str(step[-1]) for step in plan)
+
+
+def run_benchmark():
+    user_database.database_name = benchmark_database_name
+    if os.path.exists(user_database.database_path()):
+        os.remove(user_database.database_path())
+
+    try:
+        user_database.connect()
+
+        for query_name, query in benchmarked_queries.items():
+            print(f"{query_name:>18}: {query_plan(query.format(''))}")
+        print()
+
+        print(f"{'answers':>10} {'query':>18} {'indexed [ms]':>14} {'full scan [ms]':>16}")
+        for table_size in table_sizes:
+            fill_database(table_size)
+            user_database.connect_to_user_db().execute("ANALYZE")
+
+            score_ids = [random.randint(1, table_size // answers_per_score) for _ in range(repetitions)]
+            user_ids = [random.randint(1, 50) for _ in range(repetitions)]
+
+            for query_name, query in benchmarked_queries.items():
+                parameters = user_ids if query_name == 'scores of user' else score_ids
+                indexed = measure_query(query.format(""), parameters)
+                # Full table scans are slow, measure only a few of them
+                full_scan = measure_query(query.format("NOT INDEXED"), parameters[:5])
+                print(f"{table_size:>10} {query_name:>18} {indexed:>14.4f} {full_scan:>16.4f}")
+    finally:
+        user_database.close_connection()
+        if os.path.exists(user_database.database_path()):
+            os.remove(user_database.database_path())
+
+
+if __name__ == '__main__':
+    run_benchmark()
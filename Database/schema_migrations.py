@@ -0,0 +1,162 @@
+from datetime import datetime
+
+
+# This module upgrades User Databases created by older versions of the program.
+# The version of the schema is stored in "PRAGMA user_version" of the database file. Every migration upgrades
+# the schema by one version. Migrations run before the "create_..._table()" functions of user_database, which then
+# add whatever is still missing (for example triggers of rebuilt tables). A new database skips the migrations and is
+# created directly with the latest schema.
+#
+# Migrations describe the schema as it was at the time they were written, do not change them once released.
+# To change the schema, update the "create_..._table()" functions and append a new migration to "migrations".
+
+
+# ---------------------------------------------------------------------------------------------------------  Migrations:
+# Version 1: indexes used by the score and answer queries
+def _add_indexes(c):
+    c.execute("CREATE INDEX if not exists ScoreUserIndex ON ScoreTable(UserID)")
+    c.execute("CREATE INDEX if not exists AnswerScoreTypeIndex ON AnswerTable(ScoreID, AnswerType)")
+
+
+# Version 2: deleting a user deletes its scores and deleting a score deletes its answers
+def _cascade_deletes(c):
+    # Score Table
+    if not _deletes_cascade(c, "ScoreTable"):
+        c.execute("""CREATE TABLE ScoreTable_new(
+                    CustomScoreID INTEGER PRIMARY KEY NOT NULL,
+                    TestForm TEXT NOT NULL,
+                    Date INTEGER NOT NULL,
+                    UserID INTEGER NOT NULL,
+                    FOREIGN KEY(UserID) REFERENCES UserTable(CustomUserID) ON DELETE CASCADE
+                    )""")
+        # Scores of already deleted users (left behind by older versions of the program) are not copied
+        c.execute("""INSERT INTO ScoreTable_new (CustomScoreID, TestForm, Date, UserID)
+                     SELECT CustomScoreID, TestForm, Date, UserID FROM ScoreTable
+                     WHERE UserID IN (SELECT CustomUserID FROM UserTable)""")
+        c.execute("DROP TABLE ScoreTable")
+        c.execute("ALTER TABLE ScoreTable_new RENAME TO ScoreTable")
+        c.execute("CREATE INDEX if not exists ScoreUserIndex ON ScoreTable(UserID)")
+
+    # Answer Table
+    if not _deletes_cascade(c, "AnswerTable"):
+        c.execute("""CREATE TABLE AnswerTable_new(
+                    CustomAnswerID INTEGER PRIMARY KEY NOT NULL,
+                    Question TEXT NOT NULL,
+                    Answer TEXT,
+                    AnswerType TEXT,
+                    AbsoluteTime REAL,
+                    RelativeTime REAL,
+                    ScoreID INTEGER NOT NULL,
+                    FOREIGN KEY(ScoreID) REFERENCES ScoreTable(CustomScoreID) ON DELETE CASCADE
+                    )""")
+        # Answers of already deleted scores (left behind by older versions of the program) are not copied
+        c.execute("""INSERT INTO AnswerTable_new
+                     (CustomAnswerID, Question, Answer, AnswerType, AbsoluteTime, RelativeTime, ScoreID)
+                     SELECT CustomAnswerID, Question, Answer, AnswerType, AbsoluteTime, RelativeTime, ScoreID
+                     FROM AnswerTable WHERE ScoreID IN (SELECT CustomScoreID FROM ScoreTable)""")
+        c.execute("DROP TABLE AnswerTable")
+        c.execute("ALTER TABLE AnswerTable_new RENAME TO AnswerTable")
+        c.execute("CREATE INDEX if not exists AnswerScoreTypeIndex ON AnswerTable(ScoreID, AnswerType)")
+
+    # Rebuilt tables must not break any foreign key
+    violations = c.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        raise RuntimeError(f"Rebuilding tables with cascading deletes broke foreign keys: {violations}")
+
+
+# Version 3: dates of the scores are stored as integer epoch time in milliseconds and indexed
+def _epoch_dates(c):
+    # Older versions stored the date as text (for example "31/12/2022 23:59")
+    for score_id, date in c.execute("SELECT CustomScoreID, Date FROM ScoreTable WHERE typeof(Date) = 'text'")\
+            .fetchall():
+        try:
+            epoch_ms = int(datetime.strptime(date, "%d/%m/%Y %H:%M").timestamp() * 1000)
+        except ValueError:
+            continue  # Keep dates in unknown format as they are
+        c.execute("UPDATE ScoreTable SET Date = ? WHERE CustomScoreID = ?", (epoch_ms, score_id))
+
+    # (UserID, Date) index also serves every query of ScoreUserIndex
+    c.execute("DROP INDEX if exists ScoreUserIndex")
+    c.execute("CREATE INDEX if not exists ScoreUserDateIndex ON ScoreTable(UserID, Date)")
+    c.execute("CREATE INDEX if not exists ScoreDateIndex ON ScoreTable(Date)")
+
+
+# Version 4: aggregates of the answers of every score (kept up to date by triggers of user_database)
+def _score_summary(c):
+    c.execute("""CREATE TABLE if not exists ScoreSummary(
+                ScoreID INTEGER PRIMARY KEY NOT NULL,
+                StimuliCount INTEGER NOT NULL DEFAULT 0,
+                CorrectCount INTEGER NOT NULL DEFAULT 0,
+                IncorrectCount INTEGER NOT NULL DEFAULT 0,
+                LateCount INTEGER NOT NULL DEFAULT 0,
+                MissedCount INTEGER NOT NULL DEFAULT 0,
+                RepeatedCount INTEGER NOT NULL DEFAULT 0,
+                ReactionCount INTEGER NOT NULL DEFAULT 0,
+                ReactionTimeSum REAL NOT NULL DEFAULT 0,
+                MinAbsoluteTime REAL,
+                MaxAbsoluteTime REAL,
+                FOREIGN KEY(ScoreID) REFERENCES ScoreTable(CustomScoreID) ON DELETE CASCADE
+                )""")
+
+    # Summarize answers recorded before the triggers existed
+    c.execute("""INSERT OR REPLACE INTO ScoreSummary (ScoreID, StimuliCount, CorrectCount, IncorrectCount, LateCount,
+                 MissedCount, RepeatedCount, ReactionCount, ReactionTimeSum, MinAbsoluteTime, MaxAbsoluteTime)
+                 SELECT ScoreID, COUNT(*),
+                 SUM(AnswerType IS 'Correct'), SUM(AnswerType IS 'Incorrect'), SUM(AnswerType IS 'Late'),
+                 SUM(AnswerType IS 'Missed'), SUM(AnswerType IS 'Repeated'),
+                 SUM(AnswerType IS NOT NULL AND AnswerType IS NOT 'Missed'),
+                 TOTAL(CASE WHEN AnswerType IS NOT NULL AND AnswerType IS NOT 'Missed' THEN RelativeTime END),
+                 MIN(AbsoluteTime), MAX(AbsoluteTime)
+                 FROM AnswerTable GROUP BY ScoreID""")
+
+
+# List of all migrations, migration at index i upgrades the schema to version i + 1
+migrations = [_add_indexes, _cascade_deletes, _epoch_dates, _score_summary]
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+# Check if every foreign key of the table deletes its rows together with the referenced row
+def _deletes_cascade(c, table):
+    foreign_keys = c.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+    return all(foreign_key[6] == "CASCADE" for foreign_key in foreign_keys)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Upgrades the schema of the connected User Database to the latest version.
+    Every migration runs in its own transaction together with the update of "PRAGMA user_version", so an interrupted
+    upgrade continues from the last finished migration the next time.
+
+    :param conn: Connection to the User Database (must not be inside of a transaction).
+    :return: Version of the schema after the upgrade.
+    """
+    version = schema_version(conn)
+    if version >= len(migrations):
+        return version
+
+    # New database is created directly with the latest schema
+    if conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='UserTable'").fetchone() is None:
+        conn.execute(f"PRAGMA user_version={len(migrations)}")
+        return len(migrations)
+
+    # Tables are rebuilt by the migrations, foreign keys can be checked only after the rebuild is finished
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for version in range(version, len(migrations)):
+            c = conn.cursor()
+            c.execute("BEGIN")
+            try:
+                migrations[version](c)
+                c.execute(f"PRAGMA user_version={version + 1}")
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    return schema_version(conn)
@@ -1,97 +1,302 @@
 import sqlite3
 import os
+import statistics
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+# ----------------------------------------------------------------------------------------------  Import custom modules:
+from Database import schema_migrations
 
 # ----------------------------------------------------------------------------------------------  Adjustable parameters:
 database_name = "user_database.db"  # Choose your Database file to store user's data (*.db file)
+answer_types = ("Correct", "Incorrect", "Late", "Missed", "Repeated")  # Answer types summarized in the reports
+stream_batch_size = 1000  # Number of rows fetched at once by the streaming functions
+date_format = "%d/%m/%Y %H:%M"  # Format of the score dates shown to the user (dates are stored as epoch [ms])
+pragma_profile = "default"  # PRAGMA profile applied to every new connection (choose one from "pragma_profiles")
+
+# PRAGMA profiles tuning the User Database for different workloads:
+#   default   - WAL journal lets the menu read while a test is writing, commits are synced only at checkpoints
+#   recording - low write latency during tests (small cache, rare checkpoints, temporary data kept in memory)
+#   analysis  - fast bulk reads for reports (large page cache and memory mapped database file)
+pragma_profiles = {
+    'default': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -8000, 'mmap_size': 0,
+                'temp_store': 'DEFAULT'},
+    'recording': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -2000, 'mmap_size': 0,
+                  'temp_store': 'MEMORY', 'wal_autocheckpoint': 10000},
+    'analysis': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -64000, 'mmap_size': 268435456,
+                 'temp_store': 'MEMORY'},
+}
 
 
 # --------------------------------------------------------------------------------------------  Connect to the Database:
-# Create a function to connect to User Database
-def connect_to_user_db():
+# Every thread keeps its own connection to the User Database (sqlite3 connections can not be shared between threads)
+_thread_local = threading.local()
+
+
+# Create a function that returns the location of the User Database
+def database_path():
     # Specify the location where to save the .db file
     project_dir = os.getcwd()  # Get the parent of the current directory
     database_dir = f'{project_dir}/Database/'  # Path to the database directory
+    return f'{database_dir}{database_name}'  # Database '.db' is located in the Database directory
+
 
-    # Connect or create connection to User Database
-    conn = sqlite3.connect(f'{database_dir}{database_name}')  # Database '.db' is located in the Database directory
+# Create a function to connect to User Database
+def connect_to_user_db():
+    """
+    Returns the connection of the current thread to the User Database.
+    The connection is opened on the first call and reused by every following call from the same thread.
+    A new connection is opened only if the location of the database changes.
+    """
+    path = database_path()
+    conn = getattr(_thread_local, 'conn', None)
+
+    if conn is None or _thread_local.path != path:
+        if conn is not None:
+            conn.close()
+        # Connect or create connection to User Database
+        conn = sqlite3.connect(path)
+        _thread_local.conn = conn
+        _thread_local.path = path
+        _thread_local.transaction_depth = 0
+        conn.execute("PRAGMA foreign_keys=ON")  # Needed for cascading deletes of scores and answers
+        apply_pragma_profile(pragma_profile, conn)
     return conn
 
 
-# -----------------------------------------------------------------------------------------------------   Create Tables:
-# Create a function to create a user table
-def create_user_table():
+# Apply PRAGMA profile to the connection (connection of the current thread by default)
+def apply_pragma_profile(profile_name, conn=None):
+    if conn is None:
+        conn = connect_to_user_db()
+    for pragma, value in pragma_profiles[profile_name].items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+
+
+@contextmanager
+def using_pragma_profile(profile_name):
+    """
+    Context manager that switches the connection of the current thread to another PRAGMA profile
+    and switches it back to the default "pragma_profile" afterwards:
+
+        with user_database.using_pragma_profile("analysis"):
+            summary = user_database.score_summary(score_id)
+    """
+    apply_pragma_profile(profile_name)
+    try:
+        yield
+    finally:
+        apply_pragma_profile(pragma_profile)
+
+
+# Close the connection of the current thread (it is reopened by the next call of connect_to_user_db())
+def close_connection():
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _thread_local.conn = None
+        _thread_local.path = None
+        _thread_local.transaction_depth = 0
+
+
+@contextmanager
+def transaction():
+    """
+    Context manager that yields a cursor of the current thread's connection.
+    Changes are committed when the outermost "with transaction()" block ends and rolled back if it raises.
+    Nested blocks join the outer transaction, so several calls can be grouped into a single commit:
+
+        with user_database.transaction():
+            user_database.delete_answers(score_id)
+            user_database.delete_score(score_id)
+    """
     conn = connect_to_user_db()
-    c = conn.cursor()
+    _thread_local.transaction_depth += 1
+    try:
+        yield conn.cursor()
+    except BaseException:
+        _thread_local.transaction_depth -= 1
+        if _thread_local.transaction_depth == 0:
+            conn.rollback()
+        raise
+    else:
+        _thread_local.transaction_depth -= 1
+        if _thread_local.transaction_depth == 0:
+            conn.commit()
 
-    c.execute("""CREATE TABLE if not exists UserTable(
-                CustomUserID INTEGER PRIMARY KEY NOT NULL, 
-                Firstname TEXT NOT NULL, 
-                Surname TEXT NOT NULL, 
-                Age INTEGER NOT NULL, 
-                Profession TEXT, 
-                Nationality TEXT
-                )""")
 
-    conn.commit()
-    conn.close()
+# -----------------------------------------------------------------------------------------------------   Create Tables:
+# Create a function to create a user table
+def create_user_table():
+    with transaction() as c:
+        c.execute("""CREATE TABLE if not exists UserTable(
+                    CustomUserID INTEGER PRIMARY KEY NOT NULL,
+                    Firstname TEXT NOT NULL,
+                    Surname TEXT NOT NULL,
+                    Age INTEGER NOT NULL,
+                    Profession TEXT,
+                    Nationality TEXT
+                    )""")
 
 
 # Create a function to create a score table
 def create_score_table():
-    conn = connect_to_user_db()
-    c = conn.cursor()
+    with transaction() as c:
+        c.execute("""CREATE TABLE if not exists ScoreTable(
+                    CustomScoreID INTEGER PRIMARY KEY NOT NULL,
+                    TestForm TEXT NOT NULL,
+                    Date INTEGER NOT NULL,
+                    UserID INTEGER NOT NULL,
+                    FOREIGN KEY(UserID) REFERENCES UserTable(CustomUserID) ON DELETE CASCADE
+                    )""")
 
-    c.execute("""CREATE TABLE if not exists ScoreTable(
-                CustomScoreID INTEGER PRIMARY KEY NOT NULL,
-                TestForm TEXT NOT NULL,
-                Date INTEGER NOT NULL,
-                UserID INTEGER NOT NULL,
-                FOREIGN KEY(UserID) REFERENCES UserTable(CustomUserID)
-                )""")
-
-    conn.commit()
-    conn.close()
+        # Scores are selected by the user they belong to and by their date
+        # ("if not exists" also adds the indexes to databases created before the indexes were introduced)
+        c.execute("CREATE INDEX if not exists ScoreUserDateIndex ON ScoreTable(UserID, Date)")
+        c.execute("CREATE INDEX if not exists ScoreDateIndex ON ScoreTable(Date)")
 
 
 # Create a function to create an answer table
 def create_answer_table():
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("""CREATE TABLE if not exists AnswerTable(
-                CustomAnswerID INTEGER PRIMARY KEY NOT NULL,
-                Question TEXT NOT NULL,
-                Answer TEXT,
-                AnswerType TEXT, 
-                AbsoluteTime REAL,
-                RelativeTime REAL, 
-                ScoreID INTEGER NOT NULL,
-                FOREIGN KEY(ScoreID) REFERENCES ScoreTable(CustomScoreID)
-                )""")
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("""CREATE TABLE if not exists AnswerTable(
+                    CustomAnswerID INTEGER PRIMARY KEY NOT NULL,
+                    Question TEXT NOT NULL,
+                    Answer TEXT,
+                    AnswerType TEXT,
+                    AbsoluteTime REAL,
+                    RelativeTime REAL,
+                    ScoreID INTEGER NOT NULL,
+                    FOREIGN KEY(ScoreID) REFERENCES ScoreTable(CustomScoreID) ON DELETE CASCADE
+                    )""")
+
+        # Answers are selected by the score they belong to and by their type
+        # ("if not exists" also adds the index to databases created before the index was introduced)
+        c.execute("CREATE INDEX if not exists AnswerScoreTypeIndex ON AnswerTable(ScoreID, AnswerType)")
+
+
+# Create a function to create a score summary table
+def create_score_summary_table():
+    """
+    Score Summary Table holds the aggregates of the answers of every score.
+    The aggregates are kept up to date by triggers on the Answer Table, so the score lists can show
+    the accuracy and the speed of every score without reading its answers.
+    """
+    with transaction() as c:
+        c.execute("""CREATE TABLE if not exists ScoreSummary(
+                    ScoreID INTEGER PRIMARY KEY NOT NULL,
+                    StimuliCount INTEGER NOT NULL DEFAULT 0,
+                    CorrectCount INTEGER NOT NULL DEFAULT 0,
+                    IncorrectCount INTEGER NOT NULL DEFAULT 0,
+                    LateCount INTEGER NOT NULL DEFAULT 0,
+                    MissedCount INTEGER NOT NULL DEFAULT 0,
+                    RepeatedCount INTEGER NOT NULL DEFAULT 0,
+                    ReactionCount INTEGER NOT NULL DEFAULT 0,
+                    ReactionTimeSum REAL NOT NULL DEFAULT 0,
+                    MinAbsoluteTime REAL,
+                    MaxAbsoluteTime REAL,
+                    FOREIGN KEY(ScoreID) REFERENCES ScoreTable(CustomScoreID) ON DELETE CASCADE
+                    )""")
+
+        # Add new answer to the summary of its score
+        c.execute("""CREATE TRIGGER if not exists AnswerSummaryInsert AFTER INSERT ON AnswerTable
+                    BEGIN
+                        INSERT OR IGNORE INTO ScoreSummary (ScoreID) VALUES (NEW.ScoreID);
+                        {}
+                    END""".format(_add_to_summary_statement("NEW")))
+
+        # Remove deleted answer from the summary of its score
+        c.execute("""CREATE TRIGGER if not exists AnswerSummaryDelete AFTER DELETE ON AnswerTable
+                    BEGIN
+                        {}
+                    END""".format(_remove_from_summary_statement("OLD")))
+
+        # Replace updated answer in the summary (the answer can also move to another score)
+        c.execute("""CREATE TRIGGER if not exists AnswerSummaryUpdate
+                    AFTER UPDATE OF AnswerType, AbsoluteTime, RelativeTime, ScoreID ON AnswerTable
+                    BEGIN
+                        {}
+                        INSERT OR IGNORE INTO ScoreSummary (ScoreID) VALUES (NEW.ScoreID);
+                        {}
+                    END""".format(_remove_from_summary_statement("OLD"), _add_to_summary_statement("NEW")))
+
+
+# Statement of the summary triggers that adds answer ("NEW" or "OLD" row) to the summary of its score
+def _add_to_summary_statement(row):
+    return f"""UPDATE ScoreSummary SET
+                StimuliCount = StimuliCount + 1,
+                CorrectCount = CorrectCount + ({row}.AnswerType IS 'Correct'),
+                IncorrectCount = IncorrectCount + ({row}.AnswerType IS 'Incorrect'),
+                LateCount = LateCount + ({row}.AnswerType IS 'Late'),
+                MissedCount = MissedCount + ({row}.AnswerType IS 'Missed'),
+                RepeatedCount = RepeatedCount + ({row}.AnswerType IS 'Repeated'),
+                ReactionCount = ReactionCount + {_is_reaction(row)},
+                ReactionTimeSum = ReactionTimeSum + IFNULL({row}.RelativeTime * {_is_reaction(row)}, 0),
+                MinAbsoluteTime = CASE WHEN MinAbsoluteTime IS NULL OR {row}.AbsoluteTime < MinAbsoluteTime
+                                  THEN {row}.AbsoluteTime ELSE MinAbsoluteTime END,
+                MaxAbsoluteTime = CASE WHEN MaxAbsoluteTime IS NULL OR {row}.AbsoluteTime > MaxAbsoluteTime
+                                  THEN {row}.AbsoluteTime ELSE MaxAbsoluteTime END
+            WHERE ScoreID = {row}.ScoreID;"""
+
+
+# Statement of the summary triggers that removes answer ("NEW" or "OLD" row) from the summary of its score
+def _remove_from_summary_statement(row):
+    # Minimum and maximum are searched again only if the removed answer was the minimum or the maximum
+    return f"""UPDATE ScoreSummary SET
+                StimuliCount = StimuliCount - 1,
+                CorrectCount = CorrectCount - ({row}.AnswerType IS 'Correct'),
+                IncorrectCount = IncorrectCount - ({row}.AnswerType IS 'Incorrect'),
+                LateCount = LateCount - ({row}.AnswerType IS 'Late'),
+                MissedCount = MissedCount - ({row}.AnswerType IS 'Missed'),
+                RepeatedCount = RepeatedCount - ({row}.AnswerType IS 'Repeated'),
+                ReactionCount = ReactionCount - {_is_reaction(row)},
+                ReactionTimeSum = ReactionTimeSum - IFNULL({row}.RelativeTime * {_is_reaction(row)}, 0),
+                MinAbsoluteTime = CASE WHEN {row}.AbsoluteTime <= MinAbsoluteTime
+                                  THEN (SELECT MIN(AbsoluteTime) FROM AnswerTable WHERE ScoreID = {row}.ScoreID)
+                                  ELSE MinAbsoluteTime END,
+                MaxAbsoluteTime = CASE WHEN {row}.AbsoluteTime >= MaxAbsoluteTime
+                                  THEN (SELECT MAX(AbsoluteTime) FROM AnswerTable WHERE ScoreID = {row}.ScoreID)
+                                  ELSE MaxAbsoluteTime END
+            WHERE ScoreID = {row}.ScoreID;"""
+
+
+# Every answer except the missed ones is a reaction (same as number_of_reactions()), evaluates to 1 or 0
+def _is_reaction(row):
+    return f"({row}.AnswerType IS NOT NULL AND {row}.AnswerType IS NOT 'Missed')"
 
 
 # Function that creates all tables or connects to the existing ones
 def connect():
-    create_user_table()
-    create_score_table()
-    create_answer_table()
+    # Upgrade database created by an older version of the program
+    schema_migrations.migrate(connect_to_user_db())
+
+    with transaction():
+        create_user_table()
+        create_score_table()
+        create_answer_table()
+        create_score_summary_table()
+
+
+# -----------------------------------------------------------------------------------------------------  Score Dates:
+# Dates of the scores are stored as integer epoch time in milliseconds (sortable and indexed)
+def date_to_epoch_ms(date):
+    return int(date.timestamp() * 1000)
+
+
+# Convert the stored date of the score to text shown to the user
+def format_date(epoch_ms):
+    if not isinstance(epoch_ms, int):
+        return str(epoch_ms)  # Date that could not be converted from the text format of older versions
+    return datetime.fromtimestamp(epoch_ms / 1000).strftime(date_format)
 
 
 # ---------------------------------------------------------------------------------------------------  Insert Functions:
 def insert_into_answer_table(question, answer, answer_type, absolute_time, relative_time, score_id):
     if isinstance(score_id, int):
-        conn = connect_to_user_db()
-        c = conn.cursor()
-
-        c.execute("""INSERT INTO AnswerTable(Question, Answer, AnswerType, AbsoluteTime, RelativeTime, ScoreID)
-         VALUES (?, ?, ?, ?, ?, ?)""", (question, answer, answer_type, round(absolute_time, 3), round(relative_time, 3),
-                                        score_id))
-
-        conn.commit()
-        conn.close()
+        with transaction() as c:
+            c.execute("""INSERT INTO AnswerTable(Question, Answer, AnswerType, AbsoluteTime, RelativeTime, ScoreID)
+             VALUES (?, ?, ?, ?, ?, ?)""", (question, answer, answer_type, round(absolute_time, 3),
+                                            round(relative_time, 3), score_id))
         return answer_type
     else:
         return
@@ -99,25 +304,17 @@ def insert_into_answer_table(question, answer, answer_type, absolute_time, relat
 
 # Insert values into table
 def insert_into_user_table(firstname, surname, age, profession, nationality):
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("""INSERT INTO UserTable (Firstname, Surname, Age, Profession, Nationality)
-     VALUES (?, ?, ?, ?, ?)""", (firstname, surname, age, profession, nationality))
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("""INSERT INTO UserTable (Firstname, Surname, Age, Profession, Nationality)
+         VALUES (?, ?, ?, ?, ?)""", (firstname, surname, age, profession, nationality))
+    return c.lastrowid
 
 
 def insert_into_score_table(test_form, date, user_id):
     if isinstance(user_id, int):
-        conn = connect_to_user_db()
-        c = conn.cursor()
-
-        c.execute("""INSERT INTO ScoreTable (TestForm, Date, UserID) VALUES (?, ?, ?)""", (test_form, date, user_id))
-
-        conn.commit()
-        conn.close()
+        with transaction() as c:
+            c.execute("""INSERT INTO ScoreTable (TestForm, Date, UserID) VALUES (?, ?, ?)""",
+                      (test_form, date, user_id))
         return c.lastrowid
     else:
         return
@@ -125,14 +322,22 @@ def insert_into_score_table(test_form, date, user_id):
 
 def update_answer(question, answer, answer_type, absolute_time, relative_time, answer_id):
     if isinstance(answer_id, int):
-        conn = connect_to_user_db()
-        c = conn.cursor()
+        with transaction() as c:
+            c.execute("""UPDATE AnswerTable SET question = ?, Answer = ?, AnswerType = ?, AbsoluteTime = ?,
+            RelativeTime = ? WHERE rowid= ?""", (question, answer, answer_type, absolute_time, relative_time,
+                                                 answer_id))
+        return answer_type
+    else:
+        return
 
-        c.execute("""UPDATE AnswerTable SET question = ?, Answer = ?, AnswerType = ?, AbsoluteTime = ?, RelativeTime = ? 
-        WHERE rowid= ?""", (question, answer, answer_type, absolute_time, relative_time, answer_id))
 
-        conn.commit()
-        conn.close()
+# Update the latest answer of the score (missed answer which turned out to be late)
+def update_last_answer(question, answer, answer_type, absolute_time, relative_time, score_id):
+    if isinstance(score_id, int):
+        with transaction() as c:
+            c.execute("""UPDATE AnswerTable SET question = ?, Answer = ?, AnswerType = ?, AbsoluteTime = ?,
+            RelativeTime = ? WHERE rowid = (SELECT MAX(rowid) FROM AnswerTable WHERE ScoreID = ?)""",
+                      (question, answer, answer_type, round(absolute_time, 3), round(relative_time, 3), score_id))
         return answer_type
     else:
         return
@@ -141,191 +346,265 @@ def update_answer(question, answer, answer_type, absolute_time, relative_time, a
 # ---------------------------------------------------------------------------------------------------  Select Functions:
 # Select all from the User Table
 def select_all_users():
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("SELECT rowid, * FROM UserTable")
-    users = c.fetchall()
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM UserTable")
+        users = c.fetchall()
     return users
 
 
 # Select all from the User Table
 def select_every_score():
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("SELECT rowid, * FROM ScoreTable")
-    scores = c.fetchall()
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM ScoreTable")
+        scores = c.fetchall()
     return scores
 
 
 # Select all from the User Table
 def select_every_answer():
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("SELECT rowid, * FROM AnswerTable")
-    answers = c.fetchall()
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM AnswerTable")
+        answers = c.fetchall()
     return answers
 
 
 # Select current user from User Table
 def select_current_user(user_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("SELECT rowid, * FROM UserTable WHERE rowid=?", (user_id,))
-    current_user = c.fetchone()
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM UserTable WHERE rowid=?", (user_id,))
+        current_user = c.fetchone()
     return current_user
 
 
 # Select score of current user
 def select_every_score_for_current_user(user_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM ScoreTable WHERE UserID=?", (user_id,))
+        current_user_score = c.fetchall()
+    return current_user_score
 
-    c.execute("SELECT rowid, * FROM ScoreTable WHERE UserID=?", (user_id,))
-    current_user_score = c.fetchall()
 
-    conn.commit()
-    conn.close()
+# Select scores of current user made between two dates [epoch ms] (start included, end excluded), oldest first
+def select_scores_for_user_between_dates(user_id, start_date, end_date):
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM ScoreTable WHERE UserID=? AND Date >= ? AND Date < ? ORDER BY Date",
+                  (user_id, start_date, end_date))
+        selected_scores = c.fetchall()
+    return selected_scores
+
+
+# Select the latest scores (of every user or only of current user), newest first
+def select_latest_scores(number_of_scores, user_id=None):
+    with transaction() as c:
+        if user_id is None:
+            c.execute("SELECT rowid, * FROM ScoreTable ORDER BY Date DESC LIMIT ?", (number_of_scores,))
+        else:
+            c.execute("SELECT rowid, * FROM ScoreTable WHERE UserID=? ORDER BY Date DESC LIMIT ?",
+                      (user_id, number_of_scores))
+        latest_scores = c.fetchall()
+    return latest_scores
+
+
+# Select scores of current user together with their accuracy [%] and mean reaction time [ms]
+def select_every_score_with_summary_for_current_user(user_id):
+    with transaction() as c:
+        c.execute("""SELECT s.rowid, s.*,
+                     IFNULL(100.0 * m.CorrectCount / NULLIF(m.StimuliCount, 0), 0),
+                     IFNULL(m.ReactionTimeSum / NULLIF(m.ReactionCount, 0), 0)
+                     FROM ScoreTable s LEFT JOIN ScoreSummary m ON m.ScoreID = s.CustomScoreID
+                     WHERE s.UserID=?""", (user_id,))
+        current_user_score = c.fetchall()
     return current_user_score
 
 
-def select_current_score(score_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
+# Select summary of current score from Score Summary Table (None if the score has no answers)
+def select_summary_of_current_score(score_id):
+    with transaction() as c:
+        c.execute("SELECT * FROM ScoreSummary WHERE ScoreID=?", (score_id,))
+        summary = c.fetchone()
+    return summary
 
-    c.execute("SELECT rowid, * FROM ScoreTable WHERE CustomScoreID=?", (score_id,))
-    selected_score = c.fetchone()
 
-    conn.commit()
-    conn.close()
+def select_current_score(score_id):
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM ScoreTable WHERE CustomScoreID=?", (score_id,))
+        selected_score = c.fetchone()
     return selected_score
 
 
 # Select all answers of current score
 def select_every_answer_for_current_score(score_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("SELECT rowid, * FROM AnswerTable WHERE ScoreID=?", (score_id,))
-    current_user_score = c.fetchall()
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("SELECT rowid, * FROM AnswerTable WHERE ScoreID=?", (score_id,))
+        current_user_score = c.fetchall()
     return current_user_score
 
 
 # Select all reactions of current score
 def select_every_reaction_for_current_score(score_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("""
-    SELECT rowid, * FROM AnswerTable WHERE ScoreID=? AND NOT AnswerType = "Missed" """, (score_id,))
-    current_reactions = c.fetchall()
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("""
+        SELECT rowid, * FROM AnswerTable WHERE ScoreID=? AND NOT AnswerType = "Missed" """, (score_id,))
+        current_reactions = c.fetchall()
     return current_reactions
 
 
 def select_specific_answers(score_id, answer_type):
-    conn = connect_to_user_db()
-    c = conn.cursor()
+    with transaction() as c:
+        c.execute("SELECT * FROM AnswerTable WHERE ScoreID=? AND AnswerType = ?", (score_id, answer_type))
+        selected_answers = c.fetchall()
+    return selected_answers
 
-    c.execute("SELECT * FROM AnswerTable WHERE ScoreID=? AND AnswerType = ?", (score_id, answer_type))
-    selected_answers = c.fetchall()
 
-    conn.commit()
-    conn.close()
-    return selected_answers
+# ------------------------------------------------------------------------------------------------  Streaming Functions:
+def stream_rows(query, parameters=(), batch_size=None):
+    """
+    Generator that yields the rows of the query as they are fetched from the database instead of fetching all of them.
+    Only "stream_batch_size" (or "batch_size") rows are held in memory at once.
+
+    The rows are read through a separate connection, because older Python versions reset open cursors
+    when the connection of the thread commits (any other query of this module commits).
+
+    :param query: SELECT statement.
+    :param parameters: Parameters of the query.
+    :param batch_size: Yield lists of up to "batch_size" rows instead of single rows.
+    """
+    conn = sqlite3.connect(database_path())
+    try:
+        apply_pragma_profile(pragma_profile, conn)
+        c = conn.execute(query, parameters)
+        while True:
+            rows = c.fetchmany(batch_size or stream_batch_size)
+            if not rows:
+                break
+            if batch_size:
+                yield rows
+            else:
+                yield from rows
+    finally:
+        conn.close()
 
 
-# ---------------------------------------------------------------------------------------------------  Delete Functions:
-# Delete selected user from User Table
-def delete_user(user_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
+# Columns selected by the streaming functions ("rowid, *" or only the chosen columns of the table)
+def _projection(table, columns):
+    if columns is None:
+        return "rowid, *"
+    with transaction() as c:
+        table_columns = {column[1] for column in c.execute(f"PRAGMA table_info({table})")}
+    unknown_columns = [column for column in columns if column not in table_columns and column != "rowid"]
+    if unknown_columns:
+        raise ValueError(f"{table} has no columns {unknown_columns}")
+    return ", ".join(columns)
 
-    c.execute("DELETE FROM UserTable WHERE rowid=?", (user_id,))
 
-    conn.commit()
-    conn.close()
+# Stream all from the User Table (optionally only the chosen columns)
+def stream_all_users(columns=None, batch_size=None):
+    return stream_rows(f"SELECT {_projection('UserTable', columns)} FROM UserTable", batch_size=batch_size)
 
 
-# Delete selected user from User Table
-def delete_score(score_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
+# Stream all from the Score Table (optionally only the chosen columns)
+def stream_every_score(columns=None, batch_size=None):
+    return stream_rows(f"SELECT {_projection('ScoreTable', columns)} FROM ScoreTable", batch_size=batch_size)
 
-    c.execute("DELETE FROM ScoreTable WHERE rowid=?", (score_id,))
 
-    conn.commit()
-    conn.close()
+# Stream all from the Answer Table (optionally only the chosen columns)
+def stream_every_answer(columns=None, batch_size=None):
+    return stream_rows(f"SELECT {_projection('AnswerTable', columns)} FROM AnswerTable", batch_size=batch_size)
 
 
-def delete_answers(score_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
+# ---------------------------------------------------------------------------------------------------  Delete Functions:
+# Delete selected user from User Table (scores and answers of the user are deleted with it)
+def delete_user(user_id):
+    with transaction() as c:
+        c.execute("DELETE FROM UserTable WHERE rowid=?", (user_id,))
 
-    c.execute("DELETE FROM AnswerTable WHERE ScoreId=?", (score_id,))
 
-    conn.commit()
-    conn.close()
+# Delete selected score from Score Table (answers of the score are deleted with it)
+def delete_score(score_id):
+    with transaction() as c:
+        c.execute("DELETE FROM ScoreTable WHERE rowid=?", (score_id,))
+
+
+def delete_answers(score_id):
+    with transaction() as c:
+        c.execute("DELETE FROM AnswerTable WHERE ScoreId=?", (score_id,))
 
 
 # ---------------------------------------------------------------------------------------  Calculate measured variables:
 # Calculate the number of all stimuli
 def number_of_stimuli(score_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("""SELECT COUNT(*) FROM AnswerTable WHERE ScoreID = ? """, (score_id,))
-    num_of_stimuli = c.fetchone()[0]
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("""SELECT COUNT(*) FROM AnswerTable WHERE ScoreID = ? """, (score_id,))
+        num_of_stimuli = c.fetchone()[0]
     return num_of_stimuli
 
 
 # Calculate the number of all reactions
 def number_of_reactions(score_id):
-    conn = connect_to_user_db()
-    c = conn.cursor()
-
-    c.execute("""SELECT COUNT(*) FROM AnswerTable WHERE ScoreID = ? AND NOT AnswerType = "Missed" """, (score_id,))
-    num_of_stimuli = c.fetchone()[0]
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("""SELECT COUNT(*) FROM AnswerTable WHERE ScoreID = ? AND NOT AnswerType = "Missed" """,
+                  (score_id,))
+        num_of_stimuli = c.fetchone()[0]
     return num_of_stimuli
 
 
 # Calculate the number of all chosen answers
 def number_of_answers(score_id, answer_type):
-    conn = connect_to_user_db()
-    c = conn.cursor()
+    with transaction() as c:
+        c.execute(
+            """SELECT COUNT(*) FROM AnswerTable WHERE ScoreID = ? AND AnswerType = ? """,
+            (score_id, answer_type)
+        )
+        num_of_answers = c.fetchone()[0]
+    return num_of_answers
 
-    c.execute(
-        """SELECT COUNT(*) FROM AnswerTable WHERE ScoreID = ? AND AnswerType = ? """,
-        (score_id, answer_type)
-    )
-    num_of_answers = c.fetchone()[0]
 
-    conn.commit()
-    conn.close()
-    return num_of_answers
+# Summarize the current score from a single query of its answers
+def score_summary(score_id):
+    """
+    Fetches the answers of the current score once and calculates everything the report needs from that single pass.
+
+    :param score_id: ID of the summarized score.
+    :return: dictionary with:
+        'answers' - every answer of the score (same rows as select_every_answer_for_current_score()),
+        'number_of_stimuli' - number of all answers,
+        'number_of_reactions' - number of answers which are not "Missed",
+        'answer_counts' - number of answers per answer type,
+        'absolute_times' / 'relative_times' - absolute [s] and relative [ms] times of the answers per answer type,
+        'reaction_time_median' - median of the reaction times (0 if there are no reactions).
+    """
+    answers = select_every_answer_for_current_score(score_id)
+
+    answer_counts = {answer_type: 0 for answer_type in answer_types}
+    absolute_times = {answer_type: [] for answer_type in answer_types}
+    relative_times = {answer_type: [] for answer_type in answer_types}
+    reaction_times = []
+
+    # Row: rowid, CustomAnswerID, Question, Answer, AnswerType, AbsoluteTime, RelativeTime, ScoreID
+    for answer in answers:
+        answer_type = answer[4]
+        if answer_type not in answer_counts:
+            answer_counts[answer_type] = 0
+            absolute_times[answer_type] = []
+            relative_times[answer_type] = []
+        answer_counts[answer_type] += 1
+        absolute_times[answer_type].append(answer[5])
+        relative_times[answer_type].append(answer[6])
+
+        # Every answer except the missed ones is a reaction (same as number_of_reactions())
+        if answer_type is not None and answer_type != "Missed":
+            reaction_times.append(answer[6])
+
+    # Prevent no data error for statistics.median
+    try:
+        reaction_time_median = round(statistics.median(reaction_times), 3)
+    except statistics.StatisticsError:
+        reaction_time_median = 0
+
+    return {'answers': answers,
+            'number_of_stimuli': len(answers),
+            'number_of_reactions': len(reaction_times),
+            'answer_counts': answer_counts,
+            'absolute_times': absolute_times,
+            'relative_times': relative_times,
+            'reaction_time_median': reaction_time_median}
@@ -123,12 +123,11 @@ class UsersRV(RecycleView):
 
     def refresh_view(self):
         user_database.connect()
-        user_database.select_all_users()
-        user_records = user_database.select_all_users()
+        user_records = user_database.stream_all_users(columns=("rowid", "Firstname", "Surname"))
 
         # Extract data from "DTUserDatabase.db" to create Selectablelabels with users in "List of Users" screen
         self.data = [{
-            'order': str(iteration + 1)+'|', 'firstname': str(user[2]), 'surname': str(user[3]), 'user_id': str(user[0])
+            'order': str(iteration + 1)+'|', 'firstname': str(user[1]), 'surname': str(user[2]), 'user_id': str(user[0])
         } for iteration, user in enumerate(user_records)]
 
 
@@ -173,13 +172,15 @@ class ScoreRV(RecycleView):
 
     def refresh_view(self):
         user_database.connect()
-        user_database.select_all_users()
-        score_records = user_database.select_every_score_for_current_user(App.get_running_app().selected_user.user_id)
+        score_records = user_database.select_every_score_with_summary_for_current_user(
+            App.get_running_app().selected_user.user_id)
 
         # Extract data from "DTUserDatabase.db" to create Selectablelabels with scores in "User Records" screen
         self.data = [{'label_0': str(score[1]),
                       'label_3': str(score[2]),
-                      'label_4': str(score[3])
+                      'label_4': user_database.format_date(score[3]),
+                      'accuracy': f"{score[5]:.0f} %",
+                      'reaction_time': f"{score[6]:.0f}"
                       } for iteration, score in enumerate(score_records)]
 
 
@@ -239,20 +240,15 @@ class ProfileTabbedPanel(TabbedPanel):
         # Get the ID of the selected user, who is going to be deleted
         user_id = App.get_running_app().selected_user.user_id
 
-        # Delete every score for the current user
-        for score in user_database.select_every_score_for_current_user(user_id):
-            score_id = score[0]
-            user_database.delete_answers(score_id)  # Delete all the answers from the current score
-            user_database.delete_score(score_id)  # Delete the current score
-        user_database.delete_user(user_id)  # Delete the user
+        # Delete the user (every score and answer of the user is deleted with it)
+        user_database.delete_user(user_id)
         App.get_running_app().selected_user.is_selected = False  # No user is selected
         _screen_ids("User Selection Screen").user_list_view.refresh_view()
 
     # Method that deletes selected score
     def delete_score(self):
         score_id = App.get_running_app().selected_user.selected_score.score_id
-        user_database.delete_answers(score_id)
-        user_database.delete_score(score_id)
+        user_database.delete_score(score_id)  # Answers of the score are deleted with it
         App.get_running_app().selected_user.selected_score.is_selected = False
         self.ids.user_records_view.refresh_view()
 
@@ -349,7 +345,7 @@ class UserCreator(Screen):
         if App.get_running_app().selected_user.is_selected:
             score_id = user_database.insert_into_score_table(
                 "DUMMY SCORE",
-                datetime.now().strftime("%d/%m/%Y %H:%M"),
+                user_database.date_to_epoch_ms(datetime.now()),
                 App.get_running_app().selected_user.user_id
             )
 
@@ -396,7 +392,7 @@ class Score:
 
         if score_in_db is not None:
             self.score_id = score_in_db[0]
-            self.score_data = {'test_form': score_in_db[2], 'date': score_in_db[3]}
+            self.score_data = {'test_form': score_in_db[2], 'date': user_database.format_date(score_in_db[3])}
         return
 
     def __repr__(self):
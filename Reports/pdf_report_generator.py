@@ -1,5 +1,4 @@
 from Database import user_database
-import statistics
 from matplotlib import pyplot as plt
 from fpdf import FPDF
 import subprocess
@@ -30,73 +29,39 @@ def _calculate_regression(all_answers):
 def print_report_to_pdf(user_id, score_id):
     # Try fetching data if exists from DT User Database
     try:
-        # Get data from User Table
-        user = user_database.select_current_user(user_id)
+        # Tune the database connection for bulk reads while fetching the data for the report
+        with user_database.using_pragma_profile("analysis"):
+            # Get data from User Table
+            user = user_database.select_current_user(user_id)
 
-        # Get data from Score Table
-        selected_score = user_database.select_current_score(score_id)
+            # Get data from Score Table
+            selected_score = user_database.select_current_score(score_id)
 
-        # Get data from Answer Table
-        # All answers for current score
-        _all_answers = user_database.select_every_answer_for_current_score(score_id)
+            # Get data from Answer Table (every answer of the current score is fetched only once)
+            summary = user_database.score_summary(score_id)
+        _all_answers = summary['answers']
 
         # Total number of specific answers
-        num_of_stimuli = user_database.number_of_stimuli(
-            score_id)
-        num_of_reactions = user_database.number_of_reactions(
-            score_id)
-        num_of_correct_answers = user_database.number_of_answers(
-            score_id, "Correct")
-        num_of_incorrect_answers = user_database.number_of_answers(
-            score_id, "Incorrect")
-        num_of_late_answers = user_database.number_of_answers(
-            score_id, "Late")
-        num_of_missed_answers = user_database.number_of_answers(
-            score_id, "Missed")
-        num_of_repetitive_answers = user_database.number_of_answers(
-            score_id, "Repeated")
-        # List of specific answers
-        correct_answers = user_database.select_specific_answers(
-            score_id, "Correct")
-        abs_time_of_correct_answer = []
-        respond_time_of_correct_answer = []
-        for variable in correct_answers:
-            abs_time_of_correct_answer.append(variable[4])
-            respond_time_of_correct_answer.append(variable[5])
-        incorrect_answers = user_database.select_specific_answers(
-            score_id, "Incorrect")
-        abs_time_of_incorrect_answer = []
-        respond_time_of_incorrect_answer = []
-        for variable in incorrect_answers:
-            abs_time_of_incorrect_answer.append(variable[4])
-            respond_time_of_incorrect_answer.append(variable[5])
-        late_answers = user_database.select_specific_answers(
-            score_id, "Late")
-        abs_time_of_late_answer = []
-        respond_time_of_late_answer = []
-        for variable in late_answers:
-            abs_time_of_late_answer.append(variable[4])
-            respond_time_of_late_answer.append(variable[5])
-        missed_answers = user_database.select_specific_answers(
-            score_id, "Missed")
-        abs_time_of_missed_answer = []
-        respond_time_of_missed_answer = []
-        for variable in missed_answers:
-            abs_time_of_missed_answer.append(variable[4])
-            respond_time_of_missed_answer.append(variable[5])
-
-        # Calculate Reaction Time Median:
-        reactions = user_database.select_every_reaction_for_current_score(
-            score_id)
-        reaction_times = []
-        for variable in reactions:
-            reaction_times.append(variable[6])
-
-        # Prevent no data error for statistics.median
-        try:
-            reaction_time_median = round(statistics.median(reaction_times), 3)
-        except statistics.StatisticsError:
-            reaction_time_median = 0
+        num_of_stimuli = summary['number_of_stimuli']
+        num_of_reactions = summary['number_of_reactions']
+        num_of_correct_answers = summary['answer_counts']['Correct']
+        num_of_incorrect_answers = summary['answer_counts']['Incorrect']
+        num_of_late_answers = summary['answer_counts']['Late']
+        num_of_missed_answers = summary['answer_counts']['Missed']
+        num_of_repetitive_answers = summary['answer_counts']['Repeated']
+
+        # Absolute and reaction times of specific answers
+        abs_time_of_correct_answer = summary['absolute_times']['Correct']
+        respond_time_of_correct_answer = summary['relative_times']['Correct']
+        abs_time_of_incorrect_answer = summary['absolute_times']['Incorrect']
+        respond_time_of_incorrect_answer = summary['relative_times']['Incorrect']
+        abs_time_of_late_answer = summary['absolute_times']['Late']
+        respond_time_of_late_answer = summary['relative_times']['Late']
+        abs_time_of_missed_answer = summary['absolute_times']['Missed']
+        respond_time_of_missed_answer = summary['relative_times']['Missed']
+
+        # Reaction Time Median
+        reaction_time_median = summary['reaction_time_median']
 
         _regression = _calculate_regression(_all_answers)
 
@@ -160,7 +125,8 @@ def print_report_to_pdf(user_id, score_id):
         report_pdf.cell(0, 10, txt="", new_x="LMARGIN", new_y="NEXT", align='C')
         report_pdf.cell(62, 10, txt="Participant:" + " " + str(user[2]) + " " + str(user[3]), align='C')
         report_pdf.cell(65, 10, txt="Test Form:" + " " + str(selected_score[2]), align='C')
-        report_pdf.cell(65, 10, txt="Date:" + " " + str(selected_score[3]), new_x="LMARGIN", new_y="NEXT", align='C')
+        report_pdf.cell(65, 10, txt="Date:" + " " + user_database.format_date(selected_score[3]),
+                        new_x="LMARGIN", new_y="NEXT", align='C')
         report_pdf.cell(0, 10, txt="", new_x="LMARGIN", new_y="NEXT", align='C')
         report_pdf.cell(0, 10, txt="Number of stimuli: " + str(num_of_stimuli),
                         new_x="LMARGIN", new_y="NEXT", align='C')
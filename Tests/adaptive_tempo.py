@@ -0,0 +1,251 @@
+import math
+from abc import ABC, abstractmethod
+import statistics
+import timeit
+
+# -----------------------------------------------------------------------------------------  Import Custom Program Code:
+from Tests.test_engine import FixedTempo
+
+
+# This module holds the tempo policies of the adaptive test forms (strategies of AdaptiveTempo):
+#   - "mean":      mean of the last responses, mistakes count as a multiple of the current presentation time
+#   - "ewma":      exponentially weighted moving average of the responses (same penalty of the mistakes)
+#   - "staircase": weighted up/down staircase settling at a target proportion of correct answers
+#   - "quest":     Bayesian estimate (QUEST) of the presentation time with a target proportion of correct answers
+# The presentation time is read by the frame scheduler on every pass of the test loop (deadline of the current
+# stimulus) but changes only when an answer comes, so every algorithm recomputes it only in record() and in constant
+# time per answer (the response window and the QUEST grid have a fixed size).
+# Run it from the project directory to measure the algorithms: python -m Tests.adaptive_tempo
+# Tests/tempo_convergence.py compares how fast they settle with simulated participants.
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+initial_delay_ms = 1078  # Presentation time of the first stimuli [ms]
+window = 8  # Number of the last responses the presentation time is calculated from
+penalty = 2  # Mistakes count as a multiple of the current presentation time
+penalized_answers = ("Incorrect", "Late", "Missed")  # Answer types counted as mistakes
+delay_range_ms = (200, 5000)  # Presentation times the staircase and QUEST can choose from [ms]
+target_correct = 0.8  # Proportion of correct answers the staircase and QUEST settle at
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class ResponseWindow:
+    """
+    Mean of the last "size" values. Values are kept in a ring buffer with their running sum, adding a value
+    costs one subtraction and one addition whatever the size of the window.
+    """
+
+    def __init__(self, size, initial_value):
+        if size < 1:
+            raise ValueError(f"Window of {size} responses is empty")
+        self.size = size
+        self.values = [initial_value] * size
+        self.position = 0  # Index of the oldest value (overwritten by the next one)
+        self.total = initial_value * size
+
+    def add(self, value):
+        self.total += value - self.values[self.position]
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+
+    def mean(self):
+        return self.total / self.size
+
+
+class AdaptiveTempo(FixedTempo, ABC):
+    """
+    Tempo policy of the adaptive test forms, the presentation time follows the answers of the participant.
+    Algorithms implement correct(response_time_ms) and mistake(answer_type), both return the presentation time of
+    the next stimulus [ms]. "Repeated" answers do not change the tempo.
+    """
+
+    def __init__(self, initial_delay_ms=initial_delay_ms, penalized_answers=penalized_answers):
+        super().__init__(initial_delay_ms)
+        self.penalized_answers = penalized_answers
+
+    def sound_duration_ms(self):
+        return self.delay_ms
+
+    def record(self, answer_type, response_time_ms):
+        if answer_type == "Correct":
+            self.delay_ms = self.correct(response_time_ms)
+        elif answer_type in self.penalized_answers:
+            self.delay_ms = self.mistake(answer_type)
+
+    @abstractmethod
+    def correct(self, response_time_ms):
+        pass
+
+    @abstractmethod
+    def mistake(self, answer_type):
+        pass
+
+
+# Presentation time is the mean of the last responses, mistakes and misses count as a multiple of the current time
+class MeanTempo(AdaptiveTempo):
+    def __init__(self, initial_delay_ms=initial_delay_ms, window=window, penalty=penalty, **kwargs):
+        super().__init__(initial_delay_ms, **kwargs)
+        self.penalty = penalty
+        self.responses = ResponseWindow(window, initial_delay_ms)
+
+    def correct(self, response_time_ms):
+        self.responses.add(response_time_ms)
+        return self.responses.mean()
+
+    def mistake(self, answer_type):
+        self.responses.add(self.delay_ms * self.penalty)
+        return self.responses.mean()
+
+
+# Exponentially weighted moving average, "smoothing" is the weight of the last response (0.2 ~ the last 9 responses)
+class EwmaTempo(AdaptiveTempo):
+    def __init__(self, initial_delay_ms=initial_delay_ms, smoothing=0.2, penalty=penalty, **kwargs):
+        super().__init__(initial_delay_ms, **kwargs)
+        self.smoothing = smoothing
+        self.penalty = penalty
+
+    def correct(self, response_time_ms):
+        return self.delay_ms + self.smoothing * (response_time_ms - self.delay_ms)
+
+    def mistake(self, answer_type):
+        return self.delay_ms + self.smoothing * (self.delay_ms * self.penalty - self.delay_ms)
+
+
+class StaircaseTempo(AdaptiveTempo):
+    """
+    Weighted up/down staircase (Kaernbach 1991): a correct answer shortens the presentation time by "step_ms",
+    a mistake lengthens it by step_ms * target / (1 - target), so the staircase settles where the proportion of
+    correct answers is "target".
+    """
+
+    def __init__(self, initial_delay_ms=initial_delay_ms, step_ms=40, target=target_correct,
+                 delay_range_ms=delay_range_ms, **kwargs):
+        super().__init__(initial_delay_ms, **kwargs)
+        self.step_down_ms = step_ms
+        self.step_up_ms = step_ms * target / (1 - target)
+        self.minimum_delay_ms, self.maximum_delay_ms = delay_range_ms
+
+    def correct(self, response_time_ms):
+        return max(self.delay_ms - self.step_down_ms, self.minimum_delay_ms)
+
+    def mistake(self, answer_type):
+        return min(self.delay_ms + self.step_up_ms, self.maximum_delay_ms)
+
+
+class QuestTempo(AdaptiveTempo):
+    """
+    Bayesian estimate of the participant's threshold (QUEST, Watson & Pelli 1983) on a fixed grid of presentation
+    times. The probability of a correct answer at presentation time "d" for threshold "t" is
+        (1 - lapse) / (1 + exp(-(d - t) / slope_ms))
+    ("lapse" are mistakes made whatever the time, wrong keys). Every answer multiplies the posterior of the
+    thresholds by its likelihood, the next stimulus is presented for the time at which the posterior mean threshold
+    gives "target" correct answers.
+    """
+
+    def __init__(self, initial_delay_ms=initial_delay_ms, slope_ms=80, lapse=0.05, prior_sd_ms=600, grid_size=96,
+                 target=target_correct, delay_range_ms=delay_range_ms, **kwargs):
+        super().__init__(initial_delay_ms, **kwargs)
+        if not 0 < target < 1 - lapse:
+            raise ValueError(f"Target {target} is out of reach with lapse rate {lapse}")
+        self.slope_ms = slope_ms
+        self.lapse = lapse
+        self.minimum_delay_ms, self.maximum_delay_ms = delay_range_ms
+
+        # Presentation time above the threshold giving the target proportion of correct answers
+        target_level = target / (1 - lapse)
+        self.target_offset_ms = slope_ms * math.log(target_level / (1 - target_level))
+
+        # Grid of the thresholds with the prior centred on the threshold of the initial presentation time
+        step_ms = (self.maximum_delay_ms - self.minimum_delay_ms) / (grid_size - 1)
+        self.thresholds = [self.minimum_delay_ms + index * step_ms for index in range(grid_size)]
+        prior_mean_ms = initial_delay_ms - self.target_offset_ms
+        self.posterior = [math.exp(-0.5 * ((threshold - prior_mean_ms) / prior_sd_ms) ** 2)
+                          for threshold in self.thresholds]
+        self.normalize()
+
+    def normalize(self):
+        total = sum(self.posterior)
+        self.posterior = [probability / total for probability in self.posterior]
+
+    def probability_correct(self, delay_ms, threshold_ms):
+        exponent = (threshold_ms - delay_ms) / self.slope_ms
+        if exponent > 700:  # math.exp() overflows, the answer cannot be correct
+            return 0
+        return (1 - self.lapse) / (1 + math.exp(exponent))
+
+    def update(self, was_correct):
+        delay_ms = self.delay_ms
+        for index, threshold in enumerate(self.thresholds):
+            probability = self.probability_correct(delay_ms, threshold)
+            self.posterior[index] *= probability if was_correct else 1 - probability
+        self.normalize()
+
+        threshold_ms = sum(probability * threshold for probability, threshold in zip(self.posterior, self.thresholds))
+        return min(max(threshold_ms + self.target_offset_ms, self.minimum_delay_ms), self.maximum_delay_ms)
+
+    def correct(self, response_time_ms):
+        return self.update(True)
+
+    def mistake(self, answer_type):
+        return self.update(False)
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+# Algorithms selectable with the "tempo_algorithm" setting of the adaptive test forms
+tempo_algorithms = {"mean": MeanTempo, "ewma": EwmaTempo, "staircase": StaircaseTempo, "quest": QuestTempo}
+
+
+def create_tempo(algorithm):
+    if algorithm not in tempo_algorithms:
+        raise ValueError(f"Unknown tempo algorithm {algorithm}, choose from {', '.join(tempo_algorithms)}")
+    return tempo_algorithms[algorithm]()
+
+
+# ----------------------------------------------------------------------------------------------------------  Benchmark:
+# Tempo of the form before the ring buffer: every response was appended and the mean sliced out on every call
+class ListTempo(FixedTempo):
+    def __init__(self):
+        super().__init__(initial_delay_ms)
+        self.responses = [initial_delay_ms] * window
+
+    def stimulus_delay_ms(self):
+        return statistics.mean(self.responses[-window:])
+
+    def record(self, answer_type, response_time_ms):
+        if answer_type == "Correct":
+            self.responses.append(response_time_ms)
+        elif answer_type in penalized_answers:
+            self.responses.append(self.stimulus_delay_ms() * penalty)
+
+
+def benchmark(answers=180, checks_per_answer=100, repeat=3):
+    """
+    Measures a test of "answers" answers with "checks_per_answer" deadline checks between two answers
+    (the test loop checks the deadline on every pass), prints the best time of "repeat" runs of every tempo.
+    """
+    answer_types = ["Correct", "Correct", "Correct", "Incorrect", "Late", "Missed"]
+    feedback = [(answer_types[index % len(answer_types)], 300 + index % 500) for index in range(answers)]
+
+    def run_test(tempo_class, checks=checks_per_answer):
+        tempo = tempo_class()
+        for answer_type, response_time_ms in feedback:
+            for _ in range(checks):
+                tempo.stimulus_delay_ms()
+            tempo.record(answer_type, response_time_ms)
+        return tempo.stimulus_delay_ms()
+
+    # Ring buffer has to present the stimuli for the same time as the response list
+    if abs(run_test(ListTempo) - run_test(MeanTempo)) > 1e-6:
+        raise AssertionError("Ring buffer does not give the mean of the response list")
+
+    print(f"{answers} answers, {checks_per_answer} deadline checks per answer:")
+    tempos = [("list + statistics.mean", ListTempo)] + list(tempo_algorithms.items())
+    for name, tempo_class in tempos:
+        best = min(timeit.repeat(lambda: run_test(tempo_class), number=1, repeat=repeat))
+        answers_only = min(timeit.repeat(lambda: run_test(tempo_class, 0), number=1, repeat=repeat))
+        print(f"  {name:<24}{best * 1000:>10.2f} ms per test, "
+              f"{answers_only / answers * 1000000:>8.1f} us per answer")
+
+
+if __name__ == '__main__':
+    benchmark()
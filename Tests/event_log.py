@@ -0,0 +1,117 @@
+import ast
+import os
+import struct
+
+import pygame
+
+
+# This module writes and reads the event logs of the test sessions.
+# An event log holds everything the scoring of a session depends on: the settings of the test form, the seed of
+# the circle positions, the phases, the onsets of the stimuli and the processed inputs with their times [ns].
+# Tests/replay.py re-drives a test form from the log and reproduces the answers of the session.
+# Only the newest "max_event_logs" logs are kept, a new log deletes the oldest ones.
+#
+# File format (little-endian):
+#   header:   magic "DTEL", version (u8), seed (u64), score ID (i64, -1 for guests), test class (16 bytes, UTF-8),
+#             number of settings (u8)
+#   settings: name (32 bytes, UTF-8), value (32 bytes, UTF-8 Python literal, numbers and texts)
+#   records:  kind (u8), time of the timebase clock [ns] (i64), value (i32), event type (i32)
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+event_log_dir = f'{os.getcwd()}/Database/EventLogs'  # Directory with the event logs of the sessions
+max_event_logs = 500  # Only the newest event logs are kept, older ones are deleted (None keeps every log)
+
+# -----------------------------------------------------------------------------------------------------  File format:
+magic = b"DTEL"
+version = 2
+header_format = struct.Struct("<4sBQq16sB")
+setting_format = struct.Struct("<32s32s")
+record_format = struct.Struct("<Bqii")
+
+# Kinds of the records and their values
+PHASE = 0  # Phase of the test started (value: index in "phases")
+ONSET = 1  # Stimulus presented (value: index of the stimulus in the question set)
+FINISH = 2  # Last stimulus ended
+INPUT = 3  # Input processed by the test (value: key, event type: KEYDOWN or QUIT)
+
+phases = ("Instructions", "Test", "Exit")
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class EventLogWriter:
+    """
+    Observer of a test writing its event log (see TestEngine.notify()).
+    Records are buffered by the file and written when the buffer fills up or the log is closed,
+    a record costs the test loop one struct.pack().
+    """
+
+    def __init__(self, path, seed, score_id, test_class, settings):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(header_format.pack(magic, version, seed, -1 if score_id is None else score_id,
+                                           test_class.encode(), len(settings)))
+        for name, value in settings.items():
+            self.file.write(setting_format.pack(name.encode(), repr(value).encode()))
+
+    def write(self, kind, time_ns, value=0, event_type=0):
+        self.file.write(record_format.pack(kind, time_ns, value, event_type))
+
+    def phase_started(self, phase, time_ns):
+        self.write(PHASE, time_ns, phases.index(phase))
+
+    def stimulus_onset(self, stimulus_index, question, time_ns):
+        self.write(ONSET, time_ns, stimulus_index)
+
+    def test_finished(self, time_ns):
+        self.write(FINISH, time_ns)
+
+    # Window events (resizing) do not change the answers, only key presses and closing the window are logged
+    def input_processed(self, event):
+        if event.type in (pygame.KEYDOWN, pygame.QUIT):
+            self.write(INPUT, event.timestamp_ns, getattr(event, 'key', 0), event.type)
+
+    def close(self):
+        self.file.close()
+
+
+class EventLog:
+    """
+    Event log read from a file, "settings" are {attribute of the test form: value} and "records" are tuples
+    (kind, time_ns, value, event_type).
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            data = file.read()
+
+        log_magic, log_version, self.seed, score_id, test_class, number_of_settings = header_format.unpack_from(data)
+        if log_magic != magic or log_version != version:
+            raise ValueError(f"{path} is not an event log of version {version}")
+        self.score_id = None if score_id < 0 else score_id
+        self.test_class = test_class.rstrip(b"\0").decode()
+
+        self.settings = {}
+        offset = header_format.size
+        for _ in range(number_of_settings):
+            name, value = setting_format.unpack_from(data, offset)
+            self.settings[name.rstrip(b"\0").decode()] = ast.literal_eval(value.rstrip(b"\0").decode())
+            offset += setting_format.size
+
+        # Record cut off by a crash of the test is skipped
+        records_size = (len(data) - offset) // record_format.size * record_format.size
+        self.records = list(record_format.iter_unpack(data[offset:offset + records_size]))
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+def remove_old_event_logs(directory=None, keep=None):
+    """Deletes the oldest event logs of the directory, so that only "keep" newest logs are left."""
+    directory = event_log_dir if directory is None else directory
+    keep = max_event_logs if keep is None else keep
+    if keep is None or not os.path.isdir(directory):
+        return
+
+    paths = [entry.path for entry in os.scandir(directory) if entry.is_file() and entry.name.endswith(".dtlog")]
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:max(len(paths) - keep, 0)]:
+        os.remove(path)
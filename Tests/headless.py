@@ -0,0 +1,164 @@
+import math
+import pygame
+import time
+from collections import deque
+
+# -----------------------------------------------------------------------------------------  Import Custom Program Code:
+from Tests.test_environment import Timebase
+
+
+# This module runs the test forms without a display, audio device and participant (build servers, profiling):
+#   - the test environment uses the SDL dummy drivers ("TestEnvironment.set_headless()")
+#   - inputs come from a script instead of the keyboard or the control panel (ScriptedInput)
+#   - the test runs on a virtual clock, so a 4 min test takes only as long as its loop needs (virtual_timebase())
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class VirtualClock:
+    """
+    Clock which only moves when somebody sleeps on it.
+    Used as the clock of Timebase, the frame scheduler of the test loops sleeps exactly until the next deadline,
+    so every stimulus onset and every scripted press lands on its nominal time.
+    """
+
+    def __init__(self, start_ns=0):
+        self.time_ns = start_ns
+
+    # Current time [ns] (the clock is called like time.perf_counter_ns)
+    def __call__(self):
+        return self.time_ns
+
+    def sleep(self, seconds):
+        self.time_ns += round(seconds * 1000000000)
+
+
+class ScriptedInput:
+    """
+    Input source of a headless test (replaces the pygame event queue, see PygameInput).
+    Presses are given as [(delay_ms, key)], "delay_ms" is the time since the previous press (the first delay is
+    counted from the first look at the input). Every press carries the time it was scheduled for, so the response
+    times of a headless test are exact.
+    After the last press the test receives pygame.QUIT, a headless test must never wait for an input that does not
+    come.
+    """
+
+    def __init__(self, presses, quit_when_done=True):
+        self.presses = deque(presses)
+        self.quit_when_done = quit_when_done
+        self.events = deque()  # Events waiting to be processed
+        self.last_press_ns = None
+        self.now_ns = None  # Time of the last look at the input
+
+    # Move the presses which are due into the events waiting to be processed
+    def release_presses(self, now_ns):
+        self.now_ns = now_ns
+        if self.last_press_ns is None:
+            self.last_press_ns = now_ns
+
+        while self.presses:
+            delay_ms, key = self.presses[0]
+            press_time_ns = self.last_press_ns + round(delay_ms * 1000000)
+            if press_time_ns > now_ns:
+                return
+
+            self.presses.popleft()
+            self.last_press_ns = press_time_ns
+            self.events.append(pygame.event.Event(pygame.KEYDOWN, unicode="", key=key, mod=pygame.KMOD_NONE,
+                                                  timestamp_ns=press_time_ns))
+
+            # End of the script, the test is quit as if its window was closed
+            if not self.presses and self.quit_when_done:
+                self.events.append(pygame.event.Event(pygame.QUIT))
+
+    def get(self, now_ns):
+        self.release_presses(now_ns)
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+    def peek(self, now_ns):
+        self.release_presses(now_ns)
+        return bool(self.events)
+
+    def next_input_ns(self):
+        if self.last_press_ns is None:
+            return None
+        # End of the script, no input is coming anymore
+        if not self.presses:
+            return math.inf
+        return self.last_press_ns + round(self.presses[0][0] * 1000000)
+
+    # Presses which are already due are discarded as well
+    def clear(self):
+        if self.now_ns is not None:
+            self.release_presses(self.now_ns)
+        self.events.clear()
+
+    def post(self, event):
+        self.events.append(event)
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+# Timebase of a test running on a virtual clock
+def virtual_timebase():
+    clock = VirtualClock()
+    return Timebase(clock, clock.sleep)
+
+
+# Runs the test without a display on a virtual clock, returns the result of the test
+def run_headless(test, presses, quit_when_done=True):
+    test.set_headless(ScriptedInput(presses, quit_when_done), virtual_timebase())
+    return test.run()
+
+
+def check_presented_stimuli(test):
+    """
+    Runs the fixed-tempo form without answers and checks that every scheduled stimulus reaches
+    TestEnvironment.stimulus() (is drawn or played), raises AssertionError otherwise.
+    :return: Presented stimuli [(stimulus number, stimulus type)].
+    """
+    presented = []
+    draw = test.stimulus
+
+    def record(stimulus_type, circle_position, sound_duration=1500):
+        presented.append((test.presented_stimuli, stimulus_type))
+        return draw(stimulus_type, circle_position, sound_duration)
+
+    test.stimulus = record
+    # Start the test and leave its exit screen after the last stimulus
+    test_time = test.number_of_stimuli * test.stimulus_delay_time
+    run_headless(test, [(1000, pygame.K_SPACE), (test_time + 10000, pygame.K_SPACE)])
+
+    missing = sorted(set(range(test.number_of_stimuli)) - {number for number, _ in presented})
+    if missing:
+        questions = test.schedule.questions
+        raise AssertionError(f"{len(missing)} stimuli were not presented: "
+                             + ", ".join(f"{number} {questions[number % len(questions)]}" for number in missing))
+    return presented
+
+
+if __name__ == '__main__':
+    from Tests import question_set
+    from Tests.test_b import TestB
+
+    # Fixed form answered correctly 400 ms after every stimulus onset
+    test = TestB()
+    response_time = 400
+    script = [(1000, pygame.K_SPACE), (test.stimulus_delay_time + response_time, question_set.answer_set[0])]
+    script += [(test.stimulus_delay_time, key) for key in question_set.answer_set[1:test.number_of_stimuli]]
+    script += [(test.stimulus_delay_time + 3000, pygame.K_SPACE)]  # Leave the exit screen
+
+    start = time.perf_counter()
+    run_headless(test, script)
+    print(f"Virtual time: {Timebase.to_s(test.timebase.now_ns()):.1f} s, "
+          f"real time: {time.perf_counter() - start:.1f} s")
+
+    # Every stimulus of the fixed and of the shuffled question sets has to be presented
+    for seed in (None, 1, 2, 3, 4, 5):
+        test = TestB()
+        test.event_logging = False
+        test.shuffle_questions = seed is not None
+        test.seed = seed
+        presented = check_presented_stimuli(test)
+        print(f"{'Shuffled (seed ' + str(seed) + ')' if seed else 'Fixed'} question set: "
+              f"{len(presented)} stimuli presented")
@@ -0,0 +1,226 @@
+import argparse
+import heapq
+import math
+import os
+import random
+import statistics
+import time
+from collections import deque
+
+import pygame
+
+# -----------------------------------------------------------------------------------------  Import Custom Program Code:
+from Database import user_database
+from Tests import question_set
+from Tests.headless import virtual_timebase
+from Tests.test_a import TestA
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+simulation_database_name = "simulation_database.db"  # Simulated scores are kept apart from the real ones
+number_of_participants = 10
+scores_per_participant = 10  # Load runs use thousands of scores: --participants 100 --scores 30
+
+# Population of the simulated participants, every participant gets its own mean reaction time and tail
+population_mu_ms = (450, 50)  # (mean, standard deviation) of the Gaussian part of the reaction times
+population_tau_ms = (100, 200)  # (min, max) of the exponential tail of the reaction times
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class SimulatedParticipant:
+    """
+    Participant answering the stimuli of a headless test (see Tests/headless.py).
+    Reaction times follow the ex-Gaussian distribution (Gaussian "mu", "sigma" plus exponential tail "tau"), the usual
+    model of human reaction times. With "error_rate" the participant presses a wrong key, with "lapse_rate" its
+    attention lapses and it reacts "lapse_time_ms" later (after the stimulus ended in the timed test forms, the
+    self-paced form would wait forever for an answer that never comes).
+    The participant is the input source of the test and one of its observers: it answers the onsets of the stimuli
+    and leaves the instruction and exit screens after reading them.
+    """
+
+    continue_key = pygame.K_g  # Green button starts the test and leaves the exit screen of every test form
+
+    def __init__(self, mu_ms=450, sigma_ms=60, tau_ms=150, error_rate=0.05, lapse_rate=0.02, lapse_time_ms=2000,
+                 reading_time_ms=1000, minimum_reaction_time_ms=100, seed=None):
+        self.mu_ms = mu_ms
+        self.sigma_ms = sigma_ms
+        self.tau_ms = tau_ms
+        self.error_rate = error_rate
+        self.lapse_rate = lapse_rate
+        self.lapse_time_ms = lapse_time_ms
+        self.reading_time_ms = reading_time_ms
+        self.minimum_reaction_time_ms = minimum_reaction_time_ms
+        self.rng = random.Random(seed)
+
+        # Key expected for every stimulus
+        self.answer_keys = question_set.answer_keys
+        self.keys = sorted(set(self.answer_keys.values()))
+
+        self.presses = []  # Planned presses, heap of [(press time, order, key)]
+        self.planned_presses = 0
+        self.events = deque()  # Events waiting to be processed
+        self.now_ns = None  # Time of the last look at the input
+
+    # Mean reaction time of the participant [ms]
+    def mean_reaction_time_ms(self):
+        return self.mu_ms + self.tau_ms
+
+    def reaction_time_ms(self):
+        reaction_time_ms = self.rng.gauss(self.mu_ms, self.sigma_ms) + self.rng.expovariate(1 / self.tau_ms)
+        return max(reaction_time_ms, self.minimum_reaction_time_ms)
+
+    def plan_press(self, press_time_ns, key):
+        heapq.heappush(self.presses, (press_time_ns, self.planned_presses, key))
+        self.planned_presses += 1
+
+    # ---------------------------------------------------------------------------------------------  Test observer:
+    def phase_started(self, phase, time_ns):
+        if phase in ("Instructions", "Exit"):
+            self.plan_press(time_ns + self.reading_time_ms * 1000000, self.continue_key)
+
+    def stimulus_onset(self, stimulus_index, question, time_ns):
+        reaction_time_ms = self.reaction_time_ms()
+        if self.rng.random() < self.lapse_rate:
+            reaction_time_ms += self.lapse_time_ms
+
+        key = self.answer_keys[question]
+        if self.rng.random() < self.error_rate:
+            key = self.rng.choice([other_key for other_key in self.keys if other_key != key])
+        self.plan_press(time_ns + round(reaction_time_ms * 1000000), key)
+
+    # ----------------------------------------------------------------------------------------------  Input source:
+    # Move the presses which are due into the events waiting to be processed
+    def release_presses(self, now_ns):
+        self.now_ns = now_ns
+        while self.presses and self.presses[0][0] <= now_ns:
+            press_time_ns, _, key = heapq.heappop(self.presses)
+            self.events.append(pygame.event.Event(pygame.KEYDOWN, unicode="", key=key, mod=pygame.KMOD_NONE,
+                                                  timestamp_ns=press_time_ns))
+
+    def get(self, now_ns):
+        self.release_presses(now_ns)
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+    def peek(self, now_ns):
+        self.release_presses(now_ns)
+        return bool(self.events)
+
+    # Without a planned press nothing comes until the next stimulus onset or screen
+    def next_input_ns(self):
+        if not self.presses:
+            return math.inf
+        return self.presses[0][0]
+
+    # Presses which are already due are discarded as well, the planned ones still come (late answers)
+    def clear(self):
+        if self.now_ns is not None:
+            self.release_presses(self.now_ns)
+        self.events.clear()
+
+    def post(self, event):
+        self.events.append(event)
+
+
+# User of the User Database the simulated scores are recorded for
+class SimulatedUser:
+    def __init__(self, user_id, user_name):
+        self.user_id = user_id
+        self.user_name = user_name
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+def simulate_scores(test_class=TestA, participants=number_of_participants, scores=scores_per_participant, seed=None):
+    """
+    Runs headless tests answered by simulated participants, the answers are written into the User Database by
+    the real test loop.
+    :param test_class: Test form to run (TestA, TestB, TestC).
+    :param participants: Number of simulated participants, every participant is added to the User Table.
+    :param scores: Number of tests run by every participant.
+    :param seed: Seed of the simulation, the same seed gives the same answers.
+    :return: List of (score ID, mean reaction time of the participant [ms], stimulus delay at the end of the test [ms]).
+    """
+    rng = random.Random(seed)
+    user_database.connect()
+
+    results = []
+    for participant_number in range(participants):
+        mu_ms = rng.gauss(*population_mu_ms)
+        tau_ms = rng.uniform(*population_tau_ms)
+
+        surname = f"Participant {participant_number + 1}"
+        user = SimulatedUser(user_database.insert_into_user_table("Simulated", surname, 0, None, None),
+                             f"Simulated {surname}")
+
+        for _ in range(scores):
+            participant = SimulatedParticipant(mu_ms=mu_ms, tau_ms=tau_ms, seed=rng.random())
+            test = test_class()
+            test.current_user = user
+            test.event_logging = False
+            test.observers.append(participant)
+            test.set_headless(participant, virtual_timebase())
+            test.run()
+            results.append((test.score_id, participant.mean_reaction_time_ms(), test.tempo.stimulus_delay_ms()))
+    return results
+
+
+def time_report_queries(score_ids):
+    """
+    Fetches the data of the PDF report of every score the way print_report_to_pdf() does (user, score and
+    score_summary() with the "analysis" PRAGMA profile). Drawing the report is not timed, it needs matplotlib and
+    fpdf and opens every PDF in a viewer.
+    :return: List of the fetch times of the scores [s].
+    """
+    fetch_times = []
+    with user_database.using_pragma_profile("analysis"):
+        for score_id in score_ids:
+            start = time.perf_counter()
+            score = user_database.select_current_score(score_id)
+            user_database.select_current_user(score[4])  # Row: rowid, CustomScoreID, TestForm, Date, UserID
+            user_database.score_summary(score_id)
+            fetch_times.append(time.perf_counter() - start)
+    return fetch_times
+
+
+def run_simulation(participants=number_of_participants, scores=scores_per_participant, seed=None):
+    """
+    Simulates participants * scores scores into a new simulation database and prints the simulation time, the size
+    of the database, the time of the report queries and how close the adaptive tempo came to the participants.
+    """
+    user_database.database_name = simulation_database_name
+    if os.path.exists(user_database.database_path()):
+        os.remove(user_database.database_path())
+
+    start = time.perf_counter()
+    results = simulate_scores(participants=participants, scores=scores, seed=seed)
+    simulation_time = time.perf_counter() - start
+
+    user_database.connect()
+    number_of_answers = sum(1 for _ in user_database.stream_every_answer(columns=("rowid",)))
+    print(f"{len(results)} scores with {number_of_answers} answers simulated in {simulation_time:.1f} s "
+          f"({simulation_time / len(results):.2f} s per score)")
+    print(f"Database size: {os.path.getsize(user_database.database_path()) / 1024:.0f} kB")
+
+    fetch_times = time_report_queries([score_id for score_id, _, _ in results])
+    print(f"Report data of {len(fetch_times)} scores fetched in {sum(fetch_times):.2f} s "
+          f"(median {statistics.median(fetch_times) * 1000:.2f} ms, "
+          f"slowest {max(fetch_times) * 1000:.2f} ms per score)")
+
+    # Adaptive tempo should settle around the reaction times of the participant
+    delay_errors = [delay - reaction_time for _, reaction_time, delay in results if delay is not None]
+    if delay_errors:
+        print(f"Final stimulus delay - mean reaction time: {statistics.mean(delay_errors):.0f} ms "
+              f"(standard deviation {statistics.pstdev(delay_errors):.0f} ms)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate scores of the adaptive test form into the simulation "
+                                                 "database.")
+    parser.add_argument("--participants", type=int, default=number_of_participants,
+                        help="number of simulated participants")
+    parser.add_argument("--scores", type=int, default=scores_per_participant, help="scores of every participant")
+    parser.add_argument("--seed", type=int, help="seed of the simulation")
+    arguments = parser.parse_args()
+
+    run_simulation(arguments.participants, arguments.scores, arguments.seed)
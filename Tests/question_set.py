@@ -1,8 +1,17 @@
 import pygame
 import random
+import time
 
-# Shuffling questions doesn't feel random to the user "smart shuffle"
-random_seed = random.randint
+# -----------------------------------------------------------------------------------------  Import Custom Program Code:
+from Tests.stimulus_schedule import TONE, stimulus_codes, stimulus_kinds
+
+
+# Fixed question sets of the test forms. Plain shuffling of them doesn't feel random to the user (same stimulus
+# twice in a row, long runs of circles), "smart_shuffle()" generates sequences which avoid that.
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+max_modality_run = 3  # Longest run of stimuli of the same modality (circles, pedals, tones) in a shuffled sequence
+max_tone_run = 1  # Longest run of tones, as in the fixed question sets a tone is never followed by another tone
 
 question_set = ["WHITE",
                 "high_tone",
@@ -184,7 +193,6 @@ question_set = ["WHITE",
                 "WHITE",
                 "RED",
                 "GREEN"]
-# random.Random(random_seed).shuffle(question_set)
 answer_set = [pygame.K_w,
               pygame.K_UP,
               pygame.K_g,
@@ -365,7 +373,6 @@ answer_set = [pygame.K_w,
               pygame.K_w,
               pygame.K_r,
               pygame.K_g]
-# random.Random(random_seed).shuffle(answer_set)
 
 training_question_set = ["RED",
                          "low_tone",
@@ -421,3 +428,96 @@ training_answer_set = [pygame.K_r,
                        pygame.K_b,
                        pygame.K_DOWN,
                        pygame.K_w]
+
+# Key expected for every stimulus
+answer_keys = dict(zip(question_set, answer_set))
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class SmartShuffle:
+    """
+    Random stimulus sequence which feels random to the user:
+        - the same stimulus is never presented twice in a row
+        - stimuli of the same modality (circles, pedals, tones) never come more than "max_run" times in a row
+        - two tones never come in a row (see "max_tone_run")
+        - every stimulus is presented equally often (the counts differ at most by one), so the modalities keep the
+          proportions of the fixed question set
+    The sequence is built from blocks holding every stimulus once, each block is shuffled and ordered to satisfy
+    the constraints, so the generation is linear in the length of the sequence. The sequence has no end, every
+    take() continues it with the constraints kept across the parts.
+    :param seed: Seed of the sequence, the same seed gives the same sequence.
+    :param stimuli: Stimuli of the sequence (the stimuli of "question_set" by default).
+    :param max_run: Longest run of stimuli of the same modality.
+    """
+
+    def __init__(self, seed=None, stimuli=None, max_run=max_modality_run):
+        self.rng = random.Random(seed)
+        if stimuli is None:
+            stimuli = sorted(set(question_set), key=question_set.index)
+        self.stimuli = list(stimuli)
+        self.kinds = {stimulus: stimulus_kinds[stimulus_codes[stimulus]] for stimulus in self.stimuli}
+        self.max_run = max_run
+
+        self.pending = []  # Stimuli of the last block which were not taken yet
+        self.previous, self.run_kind, self.run_length = None, None, 0  # End of the last generated block
+
+    def next_block(self):
+        block = list(self.stimuli)
+        self.rng.shuffle(block)
+        block = arrange_block(block, self.kinds, self.previous, self.run_kind, self.run_length, self.max_run)
+        if block is None:
+            raise ValueError(f"Stimuli {', '.join(self.stimuli)} cannot be ordered with runs of at most "
+                             f"{self.max_run}")
+
+        for stimulus in block:
+            kind = self.kinds[stimulus]
+            self.run_length = self.run_length + 1 if kind == self.run_kind else 1
+            self.previous, self.run_kind = stimulus, kind
+        return block
+
+    def take(self, length):
+        """Next "length" stimuli of the sequence, returns lists of the questions and of the keys expected for them."""
+        while len(self.pending) < length:
+            self.pending += self.next_block()
+        questions, self.pending = self.pending[:length], self.pending[length:]
+        return questions, [answer_keys[question] for question in questions]
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+def arrange_block(block, kinds, previous, run_kind, run_length, max_run):
+    """
+    Orders the stimuli of a block ("kinds" are their modalities) so that no stimulus follows itself, no modality
+    runs longer than "max_run" and the tones don't run longer than "max_tone_run". The block continues after the
+    stimulus "previous" which ended a run of "run_length" stimuli of kind "run_kind".
+    Returns the ordered block or None if no order exists. The search backtracks only within the block, its cost
+    doesn't depend on the length of the sequence.
+    """
+    if not block:
+        return []
+
+    for index, stimulus in enumerate(block):
+        if stimulus == previous:
+            continue
+        kind = kinds[stimulus]
+        length = run_length + 1 if kind == run_kind else 1
+        if length > (min(max_run, max_tone_run) if kind == TONE else max_run):
+            continue
+        rest = arrange_block(block[:index] + block[index + 1:], kinds, stimulus, kind, length, max_run)
+        if rest is not None:
+            return [stimulus] + rest
+    return None
+
+
+def smart_shuffle(length, seed=None, stimuli=None, max_run=max_modality_run):
+    """
+    Generates a random stimulus sequence of "length" stimuli (see SmartShuffle).
+    :return: Lists of the questions and of the keys expected for them.
+    """
+    return SmartShuffle(seed, stimuli, max_run).take(length)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    sequence, _ = smart_shuffle(10000, seed=1)
+    print(f"10000 stimuli generated in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(", ".join(sequence[:18]))
@@ -0,0 +1,181 @@
+import math
+import os
+import sys
+from collections import deque
+
+import pygame
+
+# -----------------------------------------------------------------------------------------  Import Custom Program Code:
+from Database import user_database
+from Tests import event_log
+from Tests.headless import VirtualClock
+from Tests.participant_bot import SimulatedUser
+from Tests.test_a import TestA
+from Tests.test_b import TestB
+from Tests.test_c import TestC
+from Tests.test_environment import Timebase
+from Tests.training import Training
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+replay_database_name = "replay_database.db"  # Replayed answers are recorded apart from the real ones
+test_classes = {"TestA": TestA, "TestB": TestB, "TestC": TestC, "Training": Training}
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class ReplayInput:
+    """
+    Input source and observer of a test re-driven from an event log (see Tests/event_log.py).
+    The test runs on a virtual clock. Inputs are given to the test at their logged times, but never after the
+    stimulus change which followed them in the session, so every input is processed against the same stimulus as in
+    the session. The phases, onsets and the end of the test coming from the test are checked against the log,
+    a replay which does not follow the session raises ValueError.
+    """
+
+    def __init__(self, log, clock, timebase):
+        self.records = deque(log.records)
+        self.clock = clock
+        self.timebase = timebase
+        self.events = deque()  # Events waiting to be processed
+
+    # Take the next record which has to come from the test
+    def expect(self, kind, value, time_ns=None):
+        if not self.records:
+            raise ValueError("Replay continues after the end of the event log")
+
+        record_kind, record_time_ns, record_value, _ = self.records.popleft()
+        if (record_kind, record_value) != (kind, value) or (time_ns is not None and record_time_ns != time_ns):
+            raise ValueError(f"Replay diverged from the event log: expected "
+                             f"{(record_kind, record_time_ns, record_value)}, the test gave {(kind, time_ns, value)}")
+        return record_time_ns
+
+    # --------------------------------------------------------------------------------------------  Test observer:
+    def phase_started(self, phase, time_ns):
+        record_time_ns = self.expect(event_log.PHASE, event_log.phases.index(phase))
+
+        # Virtual clock skips the processing time of the session (drawing, sleeping), it is moved to the logged time
+        self.clock.time_ns = max(self.clock.time_ns, record_time_ns)
+        if phase == "Test":
+            self.timebase.epoch_ns = record_time_ns
+
+    def stimulus_onset(self, stimulus_index, question, time_ns):
+        self.expect(event_log.ONSET, stimulus_index, time_ns)
+
+    def test_finished(self, time_ns):
+        self.expect(event_log.FINISH, 0, time_ns)
+
+    # -----------------------------------------------------------------------------------------------  Input source:
+    def next_input_ns(self):
+        if not self.records or self.records[0][0] != event_log.INPUT:
+            return math.inf  # The test has to come to the next record by itself
+
+        # Input is due at its time, or at the next stimulus change if it was processed before it
+        for kind, time_ns, _, _ in self.records:
+            if kind != event_log.INPUT:
+                return min(self.records[0][1], time_ns)
+        return self.records[0][1]
+
+    def release_inputs(self, now_ns):
+        while self.next_input_ns() <= now_ns:
+            _, time_ns, key, event_type = self.records.popleft()
+            if event_type == pygame.KEYDOWN:
+                event = pygame.event.Event(pygame.KEYDOWN, unicode="", key=key, mod=pygame.KMOD_NONE,
+                                           timestamp_ns=time_ns)
+            else:
+                event = pygame.event.Event(event_type, timestamp_ns=time_ns)
+            self.events.append(event)
+
+    def get(self, now_ns):
+        self.release_inputs(now_ns)
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+    def peek(self, now_ns):
+        self.release_inputs(now_ns)
+        return bool(self.events)
+
+    # Logged inputs were all processed by the session, none of them is discarded
+    def clear(self):
+        pass
+
+    def post(self, event):
+        self.events.append(event)
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+def replay_session(path, current_user=None):
+    """
+    Runs the test of the event log again without a display, returns the replayed test.
+    :param path: Path to the event log.
+    :param current_user: User who receives the replayed answers (nothing is recorded if None).
+    """
+    log = event_log.EventLog(path)
+    if not log.records:
+        raise ValueError(f"Event log {path} is empty")
+
+    test = test_classes[log.test_class]()
+    test.current_user = current_user
+    test.seed = log.seed
+    for name, value in log.settings.items():
+        if not hasattr(test, name):
+            raise ValueError(f"{log.test_class} has no setting {name}")
+        setattr(test, name, value)
+    test.event_logging = False
+
+    # Virtual clock starts at the first logged time, so the replayed times are the times of the session
+    clock = VirtualClock(log.records[0][1])
+    timebase = Timebase(clock, clock.sleep)
+    replay_input = ReplayInput(log, clock, timebase)
+    test.observers.append(replay_input)
+    test.set_headless(replay_input, timebase)
+
+    test.run()
+    return test
+
+
+# Answers of the score without their IDs (question, answer, answer type, absolute time, relative time)
+def answers_of_score(score_id):
+    return [answer[2:7] for answer in user_database.select_every_answer_for_current_score(score_id)]
+
+
+def verify_session(path):
+    """
+    Replays the session into the replay database and compares the replayed answers with the answers of the session
+    in the User Database. Returns True if they are identical.
+    """
+    original_database_name = user_database.database_name
+    log = event_log.EventLog(path)
+
+    user_database.database_name = replay_database_name
+    if os.path.exists(user_database.database_path()):
+        os.remove(user_database.database_path())
+    try:
+        user_database.connect()
+        user = SimulatedUser(user_database.insert_into_user_table("Replay", "", 0, None, None), "Replay")
+        replayed_test = replay_session(path, user)
+        replayed_answers = answers_of_score(replayed_test.score_id)
+    finally:
+        user_database.database_name = original_database_name
+
+    if log.score_id is None:
+        print(f"{path}: guest session replayed ({len(replayed_answers)} answers), nothing to compare")
+        return True
+
+    original_answers = answers_of_score(log.score_id)
+    for number, (original, replayed) in enumerate(zip(original_answers, replayed_answers), start=1):
+        if original != replayed:
+            print(f"{path}: answer {number} differs, session: {original}, replay: {replayed}")
+            return False
+    if len(original_answers) != len(replayed_answers):
+        print(f"{path}: session has {len(original_answers)} answers, replay {len(replayed_answers)}")
+        return False
+
+    print(f"{path}: {len(replayed_answers)} answers reproduced")
+    return True
+
+
+if __name__ == '__main__':
+    # Usage: python -m Tests.replay <event log> [<event log> ...]
+    results = [verify_session(path) for path in sys.argv[1:]]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,80 @@
+import pygame
+
+
+# This module pre-renders the visual stimuli when the test window is opened (see TestEnvironment.start_pygame()).
+# Every sprite is converted to the pixel format of the window and painted on the background color of the tests,
+# so showing a stimulus is a single blit (no drawing, scaling or alpha blending). The background around the circles
+# is a run-length encoded color key, the blit copies only the pixels of the circle.
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+supersampling = 4  # Antialiased circles are drawn this many times larger and scaled down
+arrow_size = (100, 100)  # Size of the arrow icons of the tone instructions
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class SpriteAtlas:
+    """
+    Surfaces of the visual stimuli {stimulus type: surface}:
+        color circles ("WHITE", "GREEN", "RED", "YELLOW", "BLUE"), pedal bars ("left_pedal", "right_pedal")
+        and the arrow icons of the instructions ("Up Arrow", "Down Arrow").
+    :param color_scheme: Colors of the test environment, "GRAY" is the background of the sprites.
+    :param stimulus_parameters: Sizes of the circles and pedals.
+    :param antialiased: Smooth edges of the circles.
+    """
+
+    circle_colors = ('WHITE', 'GREEN', 'RED', 'YELLOW', 'BLUE')
+
+    def __init__(self, color_scheme, stimulus_parameters, antialiased=False):
+        self.background = color_scheme['GRAY']
+        self.circle_size = stimulus_parameters['circle_size']
+        self.pedal_size = (stimulus_parameters['pedal_width'], stimulus_parameters['pedal_height'])
+
+        self.sprites = {}
+        for color in self.circle_colors:
+            self.sprites[color] = self.render_circle(color_scheme[color], antialiased)
+
+        pedal = pygame.Surface(self.pedal_size).convert()
+        pedal.fill(color_scheme['WHITE'])
+        self.sprites['left_pedal'] = pedal
+        self.sprites['right_pedal'] = pedal
+
+        self.sprites['Up Arrow'] = self.render_arrow(color_scheme['WHITE'])
+        self.sprites['Down Arrow'] = pygame.transform.rotate(self.sprites['Up Arrow'], 180)
+
+    def render_circle(self, color, antialiased):
+        radius = self.circle_size
+        scale = supersampling if antialiased else 1
+        surface = pygame.Surface((2 * radius * scale, 2 * radius * scale))
+        surface.fill(self.background)
+        pygame.draw.circle(surface, color, (radius * scale, radius * scale), radius * scale)
+        if antialiased:
+            surface = pygame.transform.smoothscale(surface, (2 * radius, 2 * radius))
+        surface = surface.convert()
+        surface.set_colorkey(self.background, pygame.RLEACCEL)
+        return surface
+
+    # Arrow on a darker disc, drawn large and scaled down to smooth its edges
+    def render_arrow(self, color):
+        surface = pygame.Surface((200, 200))
+        surface.fill(self.background)
+        pygame.draw.circle(surface, [channel - 28 for channel in self.background], (100, 100), 100)
+        pygame.draw.polygon(surface, color,
+                            ((90, 160), (90, 100), (70, 100), (100, 40), (130, 100), (110, 100), (110, 160)))
+        return pygame.transform.smoothscale(surface, arrow_size).convert()
+
+    def rect(self, stimulus_type, circle_position, window_size):
+        """Area of the window the sprite of the stimulus is shown in."""
+        width, height = window_size
+        sprite_rect = self.sprites[stimulus_type].get_rect()
+        if stimulus_type == "left_pedal":
+            sprite_rect.topleft = (50, height - self.pedal_size[1] - 50)
+        elif stimulus_type == "right_pedal":
+            sprite_rect.topleft = (width - self.pedal_size[0] - 50, height - self.pedal_size[1] - 50)
+        elif stimulus_type == "Up Arrow":
+            sprite_rect.center = (width / 2, height / 2 - 100)
+        elif stimulus_type == "Down Arrow":
+            sprite_rect.center = (width / 2, height / 2 + 100)
+        else:
+            sprite_rect.center = circle_position
+        return sprite_rect
@@ -0,0 +1,82 @@
+from array import array
+
+
+# This module compiles the stimulus sequence of a test at its start (see TestEngine.run()).
+# The test loop then works with small integers instead of the question strings:
+#   - stimulus codes and kinds (circle, pedal, tone) of the stimuli in array('B')
+#   - keys expected for the stimuli in array('l'), an answer is classified by comparing two integers
+#   - positions of the circles drawn in advance, one for every presented stimulus. They are relative to the
+#     window (0-1 on both axes), so a circle stays in the window when it is resized during the test
+# The question strings are kept only for the User Database and the observers.
+# A fixed question set starts over after its last stimulus, a shuffled one is continued with new stimuli instead
+# (see question_set.SmartShuffle), so its constraints hold across the whole test.
+
+
+# -----------------------------------------------------------------------------------------------------  Stimulus codes:
+stimulus_names = ("WHITE", "GREEN", "RED", "YELLOW", "BLUE", "left_pedal", "right_pedal", "high_tone", "low_tone")
+stimulus_codes = {name: code for code, name in enumerate(stimulus_names)}
+
+# Kinds of the stimuli
+CIRCLE = 0
+PEDAL = 1
+TONE = 2
+stimulus_kinds = array('B', [CIRCLE] * 5 + [PEDAL] * 2 + [TONE] * 2)  # Kind of every stimulus code
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class StimulusSchedule:
+    """
+    Stimulus sequence of a test compiled from its question and answer set.
+    :param questions: Names of the stimuli (see "stimulus_names").
+    :param answers: Keys expected for the stimuli.
+    :param rng: Random generator of the test, the positions are drawn from it in the order of the presented stimuli,
+    a cycle of the question set at a time.
+    :param continuation: Sequence the schedule is extended from when the test gets to its end (an object with
+    take(length) returning the next questions and answers), None starts the question set over.
+    """
+
+    def __init__(self, questions, answers, rng, continuation=None):
+        if len(questions) != len(answers):
+            raise ValueError(f"{len(questions)} questions have {len(answers)} answers")
+        unknown_stimuli = set(questions) - set(stimulus_codes)
+        if unknown_stimuli:
+            raise ValueError(f"Unknown stimuli: {', '.join(sorted(unknown_stimuli))}")
+
+        self.questions = list(questions)
+        self.length = len(questions)
+        self.cycle_length = len(questions)  # Stimuli added at a time (one cycle of the question set)
+        self.codes = array('B', [stimulus_codes[question] for question in questions])
+        self.kinds = array('B', [stimulus_kinds[code] for code in self.codes])
+        self.expected_keys = array('l', answers)
+        self.continuation = continuation
+
+        self.rng = rng
+        self.positions_x = array('d')
+        self.positions_y = array('d')
+        self.compile_positions()
+
+    # Draws the positions of the circles for the next cycle of the question set
+    def compile_positions(self):
+        for _ in range(self.cycle_length):
+            self.positions_x.append(self.rng.random())
+            self.positions_y.append(self.rng.random())
+
+    # Relative position of the circle of the n-th presented stimulus (counted from 0)
+    def position(self, presented_stimuli):
+        while presented_stimuli >= len(self.positions_x):
+            self.compile_positions()
+        return self.positions_x[presented_stimuli], self.positions_y[presented_stimuli]
+
+    def extend(self):
+        """Adds the next cycle of stimuli from the continuation, returns False if the question set starts over."""
+        if self.continuation is None:
+            return False
+
+        questions, answers = self.continuation.take(self.cycle_length)
+        self.questions += questions
+        self.length += len(questions)
+        codes = [stimulus_codes[question] for question in questions]
+        self.codes.extend(codes)
+        self.kinds.extend(stimulus_kinds[code] for code in codes)
+        self.expected_keys.extend(answers)
+        return True
@@ -0,0 +1,125 @@
+import random
+import statistics
+import time
+
+# -----------------------------------------------------------------------------------------  Import Custom Program Code:
+from Database import user_database
+from Tests.adaptive_tempo import tempo_algorithms
+from Tests.headless import virtual_timebase
+from Tests.participant_bot import SimulatedParticipant, population_mu_ms, population_tau_ms, simulation_database_name
+from Tests.test_a import TestA
+
+
+# This module compares the tempo algorithms of the adaptive form (see Tests/adaptive_tempo.py) on simulated
+# participants. Every participant runs the headless adaptive form once with every algorithm as a guest (the answers
+# are not recorded). For every algorithm it prints:
+#   - stimuli until the presentation time settles (its moving average stays within "settling_tolerance" of its
+#     final value, the moving average hides the stimulus to stimulus fluctuation of the algorithms)
+#   - final presentation time relative to the mean reaction time of the participant
+#   - fluctuation of the final presentation time and the proportion of correct answers after settling
+# Run it from the project directory: python -m Tests.tempo_convergence
+
+
+# ----------------------------------------------------------------------------------------------  Adjustable parameters:
+number_of_participants = 20
+test_duration = 240000  # Duration of the simulated tests [ms]
+settling_tolerance = 0.1  # Presentation time is settled when it stays within 10 % of its final value
+settling_window = 16  # Number of stimuli of the moving average checked against the final value
+final_part = 0.25  # Final presentation time is the mean over the last quarter of the stimuli
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class TempoTrace:
+    """Observer of a test recording the presentation time of every stimulus and the classified answers."""
+
+    def __init__(self, test):
+        self.test = test
+        self.delays_ms = []
+        self.answer_types = []
+
+    def stimulus_onset(self, stimulus_index, question, time_ns):
+        self.delays_ms.append(self.test.tempo.stimulus_delay_ms())
+
+    def answer_classified(self, answer_type, response_time_ms):
+        self.answer_types.append(answer_type)
+
+    def final_delay_ms(self):
+        return statistics.mean(self.delays_ms[-max(1, round(len(self.delays_ms) * final_part)):])
+
+    # Number of stimuli presented before the moving average of the presentation time stays within the tolerance
+    def settling_stimuli(self):
+        final_delay_ms = self.final_delay_ms()
+        window_sum = 0
+        settled_from = 0
+        for index, delay_ms in enumerate(self.delays_ms):
+            window_sum += delay_ms
+            if index >= settling_window:
+                window_sum -= self.delays_ms[index - settling_window]
+            moving_average = window_sum / min(index + 1, settling_window)
+            if abs(moving_average - final_delay_ms) > settling_tolerance * final_delay_ms:
+                settled_from = index + 1
+        return settled_from
+
+    # Relative standard deviation of the presentation time over the final part of the test
+    def fluctuation(self):
+        final_delays_ms = self.delays_ms[-max(1, round(len(self.delays_ms) * final_part)):]
+        return statistics.pstdev(final_delays_ms) / statistics.mean(final_delays_ms)
+
+    def correct_after_settling(self):
+        answer_types = self.answer_types[self.settling_stimuli():]
+        if not answer_types:
+            return 0
+        return answer_types.count("Correct") / len(answer_types)
+
+
+# ----------------------------------------------------------------------------------------------------------  Functions:
+def run_algorithm(algorithm, participant):
+    """Runs the headless adaptive form answered by the participant, returns the trace of its tempo."""
+    test = TestA()
+    test.test_duration = test_duration
+    test.tempo_algorithm = algorithm
+    test.event_logging = False
+    trace = TempoTrace(test)
+    test.observers += [participant, trace]
+    test.set_headless(participant, virtual_timebase())
+    test.run()
+    return trace
+
+
+def compare_algorithms(participants=number_of_participants, seed=None):
+    """
+    Runs every tempo algorithm with the same simulated participants.
+    :return: {algorithm: [(mean reaction time of the participant [ms], TempoTrace)]}
+    """
+    rng = random.Random(seed)
+    population = [(rng.gauss(*population_mu_ms), rng.uniform(*population_tau_ms), rng.random())
+                  for _ in range(participants)]
+
+    results = {algorithm: [] for algorithm in tempo_algorithms}
+    for mu_ms, tau_ms, participant_seed in population:
+        for algorithm in tempo_algorithms:
+            # Same seed, the participant reacts the same way to every algorithm
+            participant = SimulatedParticipant(mu_ms=mu_ms, tau_ms=tau_ms, seed=participant_seed)
+            results[algorithm].append((participant.mean_reaction_time_ms(), run_algorithm(algorithm, participant)))
+    return results
+
+
+def print_comparison(results):
+    print(f"{'algorithm':<12}{'settled after':>16}{'final / mean RT':>18}{'fluctuation':>14}{'correct':>10}")
+    for algorithm, traces in results.items():
+        settling = statistics.median(trace.settling_stimuli() for _, trace in traces)
+        ratio = statistics.mean(trace.final_delay_ms() / reaction_time_ms for reaction_time_ms, trace in traces)
+        fluctuation = statistics.mean(trace.fluctuation() for _, trace in traces)
+        correct = statistics.mean(trace.correct_after_settling() for _, trace in traces)
+        print(f"{algorithm:<12}{settling:>8.0f} stimuli{ratio:>18.2f}{fluctuation:>13.0%}{correct:>10.0%}")
+
+
+if __name__ == '__main__':
+    # Recorder of the guest tests still opens a database, keep it apart from the real one
+    user_database.database_name = simulation_database_name
+
+    start = time.perf_counter()
+    comparison = compare_algorithms(seed=1)
+    print(f"{number_of_participants} simulated participants, {test_duration / 60000:.0f} min tests "
+          f"({time.perf_counter() - start:.1f} s)")
+    print_comparison(comparison)
@@ -0,0 +1,511 @@
+import pygame
+import os
+import random
+from datetime import datetime
+
+# -----------------------------------------------------------------------------------------  Import Custom Program Code:
+from Tests import event_log, question_set
+from Tests.stimulus_schedule import StimulusSchedule, TONE
+from Tests.test_environment import TestEnvironment, Timebase
+
+
+# This module holds the stimulus/response loop shared by all test forms (TestA, TestB, TestC and Training).
+# A test form only configures the engine with:
+#   - tempo policy: how long every stimulus is presented (fixed, adaptive (Tests/adaptive_tempo.py) or self-paced)
+#   - termination rule: when the test ends (after a time or after a number of stimuli)
+#   - texts of its screens and what happens with the answers (recorded into the User Database or only counted)
+
+
+# -----------------------------------------------------------------------------------------------------  Tempo policies:
+# Every stimulus is presented for the same time
+class FixedTempo:
+    def __init__(self, stimulus_delay_ms):
+        self.delay_ms = stimulus_delay_ms
+
+    # Presentation time of the current stimulus [ms], None if the next stimulus waits for an answer
+    def stimulus_delay_ms(self):
+        return self.delay_ms
+
+    # Pause between starting the test and the first stimulus [ms]
+    def start_delay_ms(self):
+        return self.delay_ms
+
+    # Longest playing time of a sound stimulus [ms]
+    def sound_duration_ms(self):
+        return 1500
+
+    # Feedback of every answer ("Missed" answers have no response time)
+    def record(self, answer_type, response_time_ms):
+        pass
+
+
+# Next stimulus is presented right after the answer to the previous one
+class SelfPacedTempo(FixedTempo):
+    def __init__(self, start_delay_ms=2000):
+        super().__init__(None)
+        self.start_delay = start_delay_ms
+
+    def start_delay_ms(self):
+        return self.start_delay
+
+
+# ------------------------------------------------------------------------------------------------  Termination rules:
+# Test ends with the first stimulus change after the time runs out
+class DurationLimit:
+    def __init__(self, duration_ms):
+        self.duration_ms = duration_ms
+
+    def finished(self, elapsed_ns, presented_stimuli):
+        return elapsed_ns >= self.duration_ms * 1000000
+
+
+# Test ends after the given number of stimuli
+class StimulusLimit:
+    def __init__(self, number_of_stimuli):
+        self.number_of_stimuli = number_of_stimuli
+
+    def finished(self, elapsed_ns, presented_stimuli):
+        return presented_stimuli >= self.number_of_stimuli
+
+
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class TestEngine(TestEnvironment):
+    """
+    Stimulus/response loop of the test forms.
+    The loop goes through the phases "Instructions" -> "Test" -> "Exit". In the "Test" phase it presents the stimuli
+    of "questions", classifies every answer as Correct/Incorrect/Late/Repeated (or Missed when the stimulus ends
+    without an answer) and stores it. Test forms configure the loop by overriding "create_tempo()",
+    "create_termination()" and the methods of their screens and answers.
+    """
+
+    questions = []  # Stimuli presented in the test
+    answers = []  # Keys expected for the stimuli
+    recorded = True  # Answers are recorded into the User Database
+    event_logging = True  # Session is written into an event log (see Tests/event_log.py), False switches it off
+    # Attributes configuring the test forms (changed by the menu), they are stored in the event log
+    settings = ("test_duration", "number_of_stimuli", "stimulus_delay_time", "tempo_algorithm", "shuffle_questions")
+
+    def __init__(self):
+        super().__init__()
+        self.test_form = ""  # Name of the test form stored with the score
+        self.tempo = None
+        self.termination = None
+        self.result = None  # Value returned by "run()"
+        self.score_id = None
+        self.event_log = None
+
+        # Stimulus sequence compiled at the start of the test
+        self.schedule = None
+        self.shuffle_questions = False  # Every test gets its own order of the questions (see smart_shuffle())
+
+        # State of the current stimulus
+        self.stimulus_index = 0
+        self.presented_stimuli = 0
+        self.answered = False
+        self.last_answer_type = None
+        self.onset_ns = 0  # Start of the current stimulus since "time zero" of the test
+        self.reset_respond_time_ns = 0  # Response times are measured from this time
+        self.answer_time_ns = 0  # Press time of the answer to the current stimulus since "time zero" of the test
+        self.current_time_ns = 0
+        self.stimulus_rect = None  # Area of the screen covered by the displayed stimulus
+        self.stimulus_drawn = False
+        self.sound_started = False
+
+        # Objects following the course of the test (for example a simulated participant)
+        self.observers = []
+
+    def create_tempo(self):
+        return FixedTempo(1500)
+
+    def create_termination(self):
+        return StimulusLimit(len(self.questions))
+
+    def notify(self, event_name, *args):
+        """
+        Tells the observers about the course of the test, observers implement the events they need:
+            phase_started(phase, time_ns)
+            stimulus_onset(stimulus_index, question, time_ns)
+            test_finished(time_ns) - the last stimulus ended
+            answer_classified(answer_type, response_time_ms) - response time is None for "Missed" answers
+            input_processed(event)
+        Times are times of self.timebase.
+        """
+        for observer in self.observers:
+            handler = getattr(observer, event_name, None)
+            if handler is not None:
+                handler(*args)
+
+    # ---------------------------------------------------------------------------------------------------  Screens:
+    def title_text(self):
+        return f"DETERMINATION TEST - {self.test_form.upper()} FORM"
+
+    # Lines of the instruction screen describing the test form (rules and duration)
+    def test_rules(self):
+        return []
+
+    # Lines of the instruction screen [(text, line)], "line" is the offset from the first line in font sizes
+    def instruction_lines(self, username):
+        lines = [f"User:       {username}", "Following test is being measured.",
+                 "Only one stimulus is being presented at a time."] + self.test_rules()
+        return list(zip(lines, [0, 2.5, 3.75, 5, 6.25, 8.75]))
+
+    # Instructions at the bottom of the instruction screen [(text, color, horizontal position)]
+    def instruction_prompts(self):
+        return [("PRESS ANY BUTTON TO BEGIN", self.color_scheme['LIGHT_GRAY'], 0.6)]
+
+    def exit_lines(self, username):
+        return [("The test is finished.", 0),
+                (f"Test ID:        {self.score_id}", 2.5),
+                (f"The results are available at {username}'s profile.", 3.75)]
+
+    def exit_prompts(self):
+        return [("PRESS ANY BUTTON TO RETURN TO THE MENU", self.color_scheme['LIGHT_GRAY'], 0.5)]
+
+    def draw_screen(self, title, lines, prompts):
+        self.main_window.fill(self.color_scheme['GRAY'])
+
+        title_surface = self.render_text(self.title, title, self.color_scheme['LIGHT_GRAY'])
+        self.main_window.blit(title_surface[0], title_surface[1].move(self.title_pos))
+
+        for text, line in lines:
+            text_surface = self.render_text(self.text, text, self.color_scheme['LIGHT_GRAY'])
+            self.main_window.blit(
+                text_surface[0],
+                text_surface[1].move(self.text_pos[0], self.text_pos[1] + self.text.size * line)
+            )
+
+        for text, color, position in prompts:
+            instr_surface = self.render_text(self.instr, text, color)
+            self.main_window.blit(
+                instr_surface[0],
+                instr_surface[1].move(self.text_pos[0] + int(self.main_window.get_width()) * position,
+                                      self.instr_pos[1])
+            )
+
+    def show_loading_screen(self):
+        self.main_window.fill(self.color_scheme['GRAY'])
+        pygame.display.flip()
+
+        title_surface = self.render_text(self.text, "Loading...", self.color_scheme['LIGHT_GRAY'])
+        self.main_window.blit(
+            title_surface[0],
+            title_surface[1].move(int(self.main_window.get_width()) * 0.44, self.text_pos[1] * 1.5))
+        pygame.display.flip()
+
+        self.timebase.sleep(2)
+
+        self.main_window.fill(self.color_scheme['GRAY'])
+        pygame.display.flip()
+
+    # ---------------------------------------------------------------------------------------------------  Answers:
+    def store_answer(self, question, answer, answer_type, absolute_time_ns, response_time_ns):
+        """Stores the answer, returns the stored answer type (None if the answers are not recorded)."""
+        return self.answer_recorder.insert_into_answer_table(
+            question,
+            answer,
+            answer_type,
+            Timebase.to_s(absolute_time_ns),
+            Timebase.to_ms(response_time_ns),
+            self.score_id
+        )
+
+    # Late answer to the previous stimulus
+    def store_late_answer(self, question, answer, absolute_time_ns, response_time_ns):
+        if self.last_answer_type == "Missed":
+            # Update missed answer to late answer in answer table
+            return self.answer_recorder.update_last_answer(
+                question,
+                answer,
+                "Late",
+                Timebase.to_s(absolute_time_ns),
+                Timebase.to_ms(response_time_ns),
+                self.score_id
+            )
+        return self.last_answer_type
+
+    def classify_answer(self, key):
+        if self.answered:
+            return "Repeated"
+        if key == self.schedule.expected_keys[self.stimulus_index]:
+            return "Correct"
+        if key == self.schedule.expected_keys[self.stimulus_index - 1]:
+            return "Late"
+        return "Incorrect"
+
+    def handle_answer(self, event):
+        """Classifies and stores the answer, returns True if the test is finished."""
+        # Get response time
+        press_time_ns = self.input_time_ns(event)
+        response_time_ns = press_time_ns - self.reset_respond_time_ns
+
+        self.update_display([self.hide_stimulus(self.stimulus_rect)])
+        pygame.mixer.stop()
+
+        answer = pygame.key.name(event.key)
+        answer_type = self.classify_answer(event.key)
+        if answer_type == "Late":
+            self.last_answer_type = self.store_late_answer(
+                self.schedule.questions[self.stimulus_index - 1], answer, press_time_ns, response_time_ns)
+        elif answer_type == "Repeated":
+            # Insert repeated answer in to answer table as incorrect answer
+            self.last_answer_type = self.store_answer(
+                "Repeated Input", answer, "Incorrect", press_time_ns, response_time_ns)
+            # Prevent over clogging of the event queue by spamming answers
+            self.clear_input()
+        else:
+            self.last_answer_type = self.store_answer(
+                self.schedule.questions[self.stimulus_index], answer, answer_type, press_time_ns, response_time_ns)
+
+        self.tempo.record(answer_type, Timebase.to_ms(response_time_ns))
+        self.notify("answer_classified", answer_type, Timebase.to_ms(response_time_ns))
+        self.answered = True
+        self.answer_time_ns = press_time_ns
+
+        # Self-paced test continues right after the answer
+        if self.tempo.stimulus_delay_ms() is None:
+            return self.next_stimulus(press_time_ns)
+        return False
+
+    # ---------------------------------------------------------------------------------------------------  Stimuli:
+    def draw_stimulus(self):
+        stimulus_type = self.schedule.questions[self.stimulus_index]
+        # Placed in the window as it is now, it could have been resized since the start of the test
+        circle_position = self.circle_position(self.schedule.position(self.presented_stimuli))
+
+        # Only the area of the previous and the new stimulus is updated
+        dirty_rects = [self.hide_stimulus(self.stimulus_rect)]
+        self.stimulus_rect = None
+        if not self.answered:
+            # Tone is played only once, a redraw after resizing the window must not replay it
+            if self.schedule.kinds[self.stimulus_index] == TONE:
+                if not self.sound_started:
+                    self.stimulus(stimulus_type, circle_position, self.tempo.sound_duration_ms())
+                    self.sound_started = True
+            else:
+                self.stimulus_rect = self.stimulus(stimulus_type, circle_position, self.tempo.sound_duration_ms())
+                dirty_rects.append(self.stimulus_rect)
+        self.update_display(dirty_rects)
+        self.stimulus_drawn = True
+
+    def next_stimulus(self, onset_ns):
+        """
+        Moves to the next stimulus, returns True if the test is finished.
+        :param onset_ns: Start of the next stimulus since "time zero" of the test. It is the end of the previous
+        stimulus (its deadline or the answer to it), not the time the loop got round to it, so the onsets don't drift.
+        """
+        # Clear Event Queue to prevent from reacting before stimulus shown
+        self.clear_input()
+
+        self.presented_stimuli += 1
+        self.stimulus_index += 1
+        if self.stimulus_index == self.schedule.length and not self.schedule.extend():
+            self.stimulus_index = 0
+
+        # Reset stimulus time (and reaction time if answered)
+        self.onset_ns = onset_ns
+        if self.answered:
+            self.reset_respond_time_ns = self.onset_ns
+        self.answered = False
+        self.stimulus_drawn = False
+        self.sound_started = False
+
+        finished = self.termination.finished(self.onset_ns, self.presented_stimuli)
+        if finished:
+            self.notify("test_finished", self.timebase.to_absolute_ns(self.onset_ns))
+        else:
+            self.notify("stimulus_onset", self.stimulus_index, self.schedule.questions[self.stimulus_index],
+                        self.timebase.to_absolute_ns(self.onset_ns))
+        return finished
+
+    # Deadline of the current stimulus for the frame scheduler (None if it waits for an answer)
+    def stimulus_deadline_ns(self):
+        delay_ms = self.tempo.stimulus_delay_ms()
+        if delay_ms is None:
+            return None
+        return self.timebase.to_absolute_ns(self.onset_ns + int(delay_ms * 1000000))
+
+    # --------------------------------------------------------------------------------------------------  Finishing:
+    def finish(self):
+        """Called after the last stimulus, returns True to show the exit screen (False returns "result")."""
+        self.show_loading_screen()
+
+        # Write all the recorded answers into the User Database
+        self.stop_recording()
+        return True
+
+    # Input on the exit screen, returns True to leave the test
+    def leave_exit_screen(self, key):
+        pygame.quit()
+        return True
+
+    # Start writing the event log of the session
+    def open_event_log(self, seed):
+        if not self.event_logging:
+            return
+        os.makedirs(event_log.event_log_dir, exist_ok=True)
+        path = (f"{event_log.event_log_dir}/{self.test_form}_{self.score_id or 'Guest'}_"
+                f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.dtlog")
+        settings = {name: getattr(self, name) for name in self.settings if hasattr(self, name)}
+        self.event_log = event_log.EventLogWriter(path, seed, self.score_id, repr(self), settings)
+        self.observers.append(self.event_log)
+        event_log.remove_old_event_logs()
+
+    def close_event_log(self):
+        if self.event_log is not None:
+            self.observers.remove(self.event_log)
+            self.event_log.close()
+            self.event_log = None
+
+    # Method that starts the test
+    def run(self, phase="Instructions"):
+        self.start_pygame()
+
+        # Positions of the circles are drawn from a seed stored in the event log
+        seed = random.getrandbits(64) if self.seed is None else self.seed
+        self.rng.seed(seed)
+
+        title = self.title_text()
+        pygame.display.set_caption(f"DT Test Form: {self.test_form}")
+
+        self.tempo = self.create_tempo()
+        self.termination = self.create_termination()
+        self.result = None
+
+        self.stimulus_index = 0
+        self.presented_stimuli = 0
+        self.answered = False
+        self.last_answer_type = None
+        self.onset_ns = 0
+        self.reset_respond_time_ns = 0
+        self.answer_time_ns = 0
+        self.current_time_ns = 0
+        self.stimulus_rect = None
+        self.stimulus_drawn = False
+        self.sound_started = False
+
+        # Shuffled order of the questions is drawn from the same seed as the positions of the circles, the shuffled
+        # sequence is continued (not started over) if the test runs through all of it
+        questions, answers, shuffle = self.questions, self.answers, None
+        if self.shuffle_questions:
+            shuffle = question_set.SmartShuffle(self.rng.getrandbits(64), sorted(set(questions), key=questions.index))
+            questions, answers = shuffle.take(len(self.questions))
+
+        # Codes, expected keys and circle positions of the stimuli are compiled before the first stimulus
+        self.schedule = StimulusSchedule(questions, answers, self.rng, shuffle)
+
+        # Connect to the input device (presses of the control panel buttons are posted as key events)
+        self.search_for_input_device()
+
+        # Record answers for current user if the user is in the user database
+        username, self.score_id = "Guest", None
+        if self.recorded:
+            username, self.score_id = self.record_answers(self.test_form)
+
+        self.main_window.fill(self.color_scheme['GRAY'])
+
+        self.open_event_log(seed)
+        try:
+            return self.main_loop(phase, title, username)
+        finally:
+            # Buttons stay open until the exit screen is left, they are needed to leave it
+            self.close_input_device()
+            self.close_event_log()
+
+    # Phases of the test, returns "result" when the test is left
+    def main_loop(self, phase, title, username):
+        self.notify("phase_started", phase, self.timebase.now_ns())
+
+        # Main while loop
+        while True:
+            finished = False
+
+            # Event loop
+            for event in self.get_events():
+                self.notify("input_processed", event)
+
+                # Exit test environment if pressed "ESC" key or "close" button
+                if self.exit(phase, event, self.score_id):
+                    return self.result
+
+                # Scan for input (button/key)
+                if event.type == pygame.KEYDOWN and not event.key == pygame.K_f:
+                    # Start test by pressing any button/key
+                    if phase == "Instructions":
+                        phase = "Test"
+                        self.main_window.fill(self.color_scheme['GRAY'])
+                        pygame.display.flip()
+                        self.timebase.sleep(self.tempo.start_delay_ms() / 1000)
+                        # Clear Event Queue to prevent from reacting before stimulus shown
+                        self.clear_input()
+                        # Set "time zero" of the test
+                        self.timebase.start()
+                        self.notify("phase_started", phase, self.timebase.epoch_ns)
+                        self.notify("stimulus_onset", self.stimulus_index,
+                                    self.schedule.questions[self.stimulus_index],
+                                    self.timebase.to_absolute_ns(self.onset_ns))
+
+                    # Catch reaction
+                    elif phase == "Test":
+                        finished = self.handle_answer(event)
+                        if finished:
+                            break
+
+                    # Return to the menu by pressing any button/key if in the "Exit screen"
+                    elif phase == "Exit":
+                        if self.leave_exit_screen(event.key):
+                            return self.result
+
+            # Display START message
+            if phase == "Instructions":
+                self.draw_screen(title, self.instruction_lines(username), self.instruction_prompts())
+
+            # Start the test
+            elif phase == "Test" and not finished:
+                self.current_time_ns = self.timebase.elapsed_ns()
+
+                # Redraw the whole screen after the window was resized
+                if self.window_changed:
+                    self.stimulus_drawn = False
+
+                # Display stimulus
+                if not self.stimulus_drawn:
+                    self.draw_stimulus()
+
+                # End of current stimulus
+                deadline_ns = self.stimulus_deadline_ns()
+                if deadline_ns is not None and self.timebase.to_absolute_ns(self.current_time_ns) >= deadline_ns:
+                    # Answer can shorten the presentation time of the adaptive form so much that the deadline falls
+                    # before it, the next stimulus must not start before the answer
+                    end_ns = deadline_ns - self.timebase.epoch_ns
+                    if self.answered:
+                        end_ns = max(end_ns, self.answer_time_ns)
+
+                    # Check for missed answers
+                    if not self.answered:
+                        self.last_answer_type = self.store_answer(
+                            self.schedule.questions[self.stimulus_index], None, "Missed", end_ns, 0)
+                        self.tempo.record("Missed", None)
+                        self.notify("answer_classified", "Missed", None)
+
+                    finished = self.next_stimulus(end_ns)
+
+            # Display EXIT message
+            elif phase == "Exit":
+                self.draw_screen(title, self.exit_lines(username), self.exit_prompts())
+
+            # Finish test after the last stimulus
+            if finished:
+                if not self.finish():
+                    return self.result
+                phase = "Exit"
+                self.notify("phase_started", phase, self.timebase.now_ns())
+                continue
+
+            # While loop routine (the "Test" phase updates only the changed part of the screen)
+            if not phase == "Test":
+                pygame.display.update()
+                self.wait_for_next_frame()
+
+            # Sleep until the current stimulus ends or an input arrives (a new stimulus is drawn without waiting)
+            elif self.stimulus_drawn:
+                self.wait_for_next_frame(self.stimulus_deadline_ns())
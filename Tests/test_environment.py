@@ -4,36 +4,113 @@ from abc import ABC, abstractmethod
 from gpiozero.pins.pigpio import PiGPIOFactory
 from gpiozero import Button
 import random
+import time
 from datetime import datetime
 import os
+from collections import deque
 
 # ----------------------------------------------------------------------------------------------  Import custom modules:
 from Database import user_database
+from Database.answer_recorder import AnswerRecorder
+from Tests.sprite_atlas import SpriteAtlas
 
 
-# Fixme Sounds stops playing after some time in adaptive test
+# ------------------------------------------------------------------------------------------------------------  Classes:
+class Timebase:
+    """
+    Clock of the test shared by the stimulus onsets, key presses and the frame scheduler.
+    time.perf_counter_ns() is monotonic and high-resolution, unlike the wall clock it cannot jump when the system
+    time is adjusted (NTP). All times are integer nanoseconds since "start()", they are converted to milliseconds
+    or seconds only when they are stored.
+    The test loops wait with "sleep()" of the timebase, so a virtual clock can replace both the clock and the sleep
+    (see Tests/headless.py).
+    """
+
+    def __init__(self, clock=time.perf_counter_ns, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep  # Waits the given number of seconds of the clock
+        self.epoch_ns = clock()
+
+    # Set "time zero" of the test
+    def start(self):
+        self.epoch_ns = self.clock()
+
+    # Current time of the clock (used for deadlines)
+    def now_ns(self):
+        return self.clock()
+
+    # Time since "time zero" of the test
+    def elapsed_ns(self):
+        return self.clock() - self.epoch_ns
+
+    # Clock time of a time measured since "time zero" of the test
+    def to_absolute_ns(self, elapsed_ns):
+        return self.epoch_ns + elapsed_ns
+
+    @staticmethod
+    def to_ms(time_ns):
+        return time_ns / 1000000
+
+    @staticmethod
+    def to_s(time_ns):
+        return time_ns / 1000000000
+
+
+# Input source of the test loops reading the pygame event queue (keyboard, window events and posted button presses)
+class PygameInput:
+    # Events waiting to be processed, "now_ns" is the current time of the test timebase
+    def get(self, now_ns):
+        return pygame.event.get()
+
+    # True if there is an event waiting to be processed
+    def peek(self, now_ns):
+        return pygame.event.peek()
+
+    # Time of the next input if it is known in advance (never for the real inputs, math.inf if no input is coming)
+    def next_input_ns(self):
+        return None
+
+    def clear(self):
+        pygame.event.clear()
+
+    def post(self, event):
+        pygame.event.post(event)
 
 
-# ------------------------------------------------------------------------------------------------------------  Classes:
 # Abstract class defining test environments
 class TestEnvironment(ABC):
-    # Display parameters
-    FPS_ceiling = 2000  # Frame rate celling
+    # Frame scheduler parameters (see "wait_for_next_frame()")
+    idle_frame_time_ns = 16666667  # Longest sleep of screens without a running stimulus (~60 FPS)
+    wake_up_interval_ns = 1000000  # The sleeping scheduler checks for input every 1 ms
+    spin_time_ns = 500000  # Final part of the wait which is busy-waited to keep the deadline precise
 
-    stimulus_parameters = {'circle_size': 100, 'pedal_width': 150, 'pedal_height': 250, 'volume': 0.2}
+    stimulus_parameters = {'circle_size': 100, 'pedal_width': 150, 'pedal_height': 250, 'volume': 0.2,
+                           'antialiased': False}
+
+    # Keys represented by the buttons of the control panel {button: (unicode, key)}
+    button_keys = {'white_button': ("w", pygame.K_w), 'yellow_button': ("y", pygame.K_y),
+                   'green_button': ("g", pygame.K_g), 'blue_button': ("b", pygame.K_b),
+                   'red_button': ("r", pygame.K_r), 'up_button': (None, pygame.K_UP),
+                   'down_button': (None, pygame.K_DOWN), 'left_pedal': (None, pygame.K_LEFT),
+                   'right_pedal': (None, pygame.K_RIGHT)}
 
     # Switch debounce time [s] - countermeasure to left pedal "Switch Bounce"
+    # Repeated presses of the same key within this time are ignored (see "get_events()")
     debounce_time = 0.2  # Empirically measured time... could be around 190 ms
 
+    # Headless mode runs the test without a display and audio device (see "set_headless()")
+    headless = False
+    headless_window_size = (1920, 1080)  # Size of the window drawn by the dummy video driver
+
     # Directory to search for dependencies
     project_dir = os.getcwd()
     tests_style_dir = f'{project_dir}/Tests/Style'
 
     # Pygame environment properties
-    clock = None
     monitor_size = None
     main_window = None
     fullscreen = True
+    window_changed = False  # Window was resized or recreated, the whole screen has to be redrawn
     sound_bank = {}
     title = None
     text = None
@@ -41,11 +118,32 @@ class TestEnvironment(ABC):
     title_pos = None
     text_pos = None
     instr_pos = None
+    text_cache = {}  # Rendered text surfaces {(font, text, color, size): (surface, rect)}
+    text_cache_size = 256  # Maximum number of cached text surfaces
+    sprite_atlas = None  # Pre-rendered visual stimuli (created with the window, see Tests/sprite_atlas.py)
+
+    # Clock of the test (created for every test environment)
+    timebase = None
+
+    # Write-behind recorder of the answers (created for every test in "record_answers()")
+    answer_recorder = None
 
     def __init__(self, device=None, current_user=None):
         # Current user
         self.current_user = current_user
         self.device = device
+        self.timebase = Timebase()
+        # Source of the key and window events of the test loops
+        self.input_source = PygameInput()
+        # Random positions of the circles, seeded for every test so a session can be replayed (see Tests/replay.py)
+        self.seed = None  # Seed of the next test, a new one is drawn if None
+        self.rng = random.Random()
+        # Button presses reported by the control panel, waiting to be posted as key events [(unicode, key, time)]
+        self.button_presses = deque()
+        # Time of the last accepted press of every key {key: time}
+        self.last_press_times = {}
+        # Buttons of the control panel, kept for the whole test (gpiozero closes a Button once it is not referenced)
+        self.buttons = {}
         self.test_name = ""
         self.test_info = ""  # Description of the test that is specified for each test individually
         # Style color palette
@@ -59,20 +157,40 @@ class TestEnvironment(ABC):
     def __repr__(self):
         pass
 
+    def set_headless(self, input_source=None, timebase=None):
+        """
+        Runs the test without a display and audio device using the SDL dummy drivers.
+        :param input_source: Replaces the pygame event queue as the source of the inputs (see PygameInput).
+        :param timebase: Replaces the clock of the test, a Timebase of a virtual clock runs the test loops
+        as fast as possible instead of in real time.
+        """
+        self.headless = True
+        if input_source is not None:
+            self.input_source = input_source
+        if timebase is not None:
+            self.timebase = timebase
+            # Busy-waiting for a virtual clock would never end, it only moves when the scheduler sleeps
+            self.spin_time_ns = 0
+
     def start_pygame(self):
         """
         Initializing pygame with pygame.init() directly from the class builder causes issues
         with Kivy. Cannot reopen menu window after quiting pygame.
         This method is called in every "run()" to initialize pygame.
         """
+        # Dummy drivers are chosen before SDL is initialized
+        if self.headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
         # Initialize Pygame
         pygame.init()
 
-        # Define clock
-        self.clock = pygame.time.Clock()
-
         # Get Monitor Info
-        self.monitor_size = (pygame.display.Info().current_w, pygame.display.Info().current_h)
+        if self.headless:
+            self.monitor_size = self.headless_window_size
+        else:
+            self.monitor_size = (pygame.display.Info().current_w, pygame.display.Info().current_h)
 
         # Set up the test window
         self.main_window = pygame.display.set_mode(self.monitor_size, pygame.FULLSCREEN)
@@ -96,18 +214,81 @@ class TestEnvironment(ABC):
         self.instr = pygame.freetype.Font(instr[0], instr[1])
         self.instr_pos = (150, self.monitor_size[1] / 1.05 - instr[1] * 1.5)
 
+        # Surfaces rendered with the fonts of the previous run are not valid anymore
+        self.text_cache = {}
+        self.build_sprite_atlas()
+        self.window_changed = False
+
+    def render_text(self, font, text, color, size=None):
+        """
+        Renders the text only the first time it is displayed, every other frame reuses the cached surface.
+        Rasterizing the same static text on every frame of the "Instructions" and "Exit" screens is expensive.
+        :param font: pygame.freetype.Font used to render the text (self.title, self.text or self.instr).
+        :param text: Text to render.
+        :param color: Color of the text.
+        :param size: Size of the text, font size is used if not given.
+        :return: Tuple (surface, rect) returned by pygame.freetype.Font.render().
+        """
+        if size is None:
+            size = font.size
+        key = (font, text, color, size)
+        rendered_text = self.text_cache.get(key)
+        if rendered_text is None:
+            # Texts changing every frame (counters, timers) would otherwise grow the cache without limit
+            if len(self.text_cache) >= self.text_cache_size:
+                self.text_cache.clear()
+            rendered_text = font.render(text=text, fgcolor=color, size=size)
+            self.text_cache[key] = rendered_text
+        return rendered_text
+
+    def wait_for_next_frame(self, deadline_ns=None):
+        """
+        Frame scheduler of the test loops. Sleeps until the deadline (for example the end of the current stimulus)
+        or until an input arrives. The sleep is split into short slices to check for input in between and only
+        the last "spin_time_ns" before the deadline is busy-waited, so the timing stays precise without
+        occupying the whole CPU core (and the audio mixer thread) like a busy frame loop would.
+        :param deadline_ns: Time of self.timebase at which the next frame is due, without it the screen is only
+        refreshed every "idle_frame_time_ns" (static screens).
+        """
+        if deadline_ns is None:
+            deadline_ns = self.timebase.now_ns() + self.idle_frame_time_ns
+
+        while True:
+            # Wake up the test loop as soon as there is an input to process
+            self.post_button_presses()
+            if self.input_source.peek(self.timebase.now_ns()):
+                return
+
+            now_ns = self.timebase.now_ns()
+            remaining_time_ns = deadline_ns - now_ns
+            if remaining_time_ns <= 0:
+                return
+            if remaining_time_ns > self.spin_time_ns:
+                # Simulated input sources know the time of their next input, they don't have to be polled
+                next_input_ns = self.input_source.next_input_ns()
+                if next_input_ns is None:
+                    sleep_time_ns = min(remaining_time_ns - self.spin_time_ns, self.wake_up_interval_ns)
+                else:
+                    sleep_time_ns = min(remaining_time_ns - self.spin_time_ns, next_input_ns - now_ns)
+                self.timebase.sleep(sleep_time_ns / 1000000000)
+
     # Function that remaps input from hardware buttons and presents them as a keyboard input
-    @staticmethod
-    def pressing_button(unicode, represented_key):
+    def pressing_button(self, unicode, represented_key, timestamp_ns=None):
         button_event = pygame.event.Event(
             pygame.KEYDOWN,
             unicode=unicode,
             key=represented_key,
-            mod=pygame.KMOD_NONE
+            mod=pygame.KMOD_NONE,
+            timestamp_ns=timestamp_ns  # Time of self.timebase at which the button was pressed
         )
-        pygame.event.post(button_event)
+        self.input_source.post(button_event)
 
     def search_for_input_device(self):
+        # Release the buttons and forget the presses of the previous test
+        self.close_input_device()
+        self.button_presses.clear()
+        self.last_press_times.clear()
+
         # Buttons have no hardware representation
         buttons = {'white_button': None, 'yellow_button': None, 'green_button': None, 'blue_button': None,
                    'red_button': None, 'up_button': None, 'down_button': None, 'left_pedal': None, 'right_pedal': None}
@@ -133,99 +314,134 @@ class TestEnvironment(ABC):
                 buttons['left_pedal'] = Button(24, pin_factory=factory, pull_up=False)
                 buttons['right_pedal'] = Button(25, pin_factory=factory, pull_up=False)
 
+                # Buttons report their presses through callbacks instead of being polled every frame
+                for button_name, (unicode, represented_key) in self.button_keys.items():
+                    buttons[button_name].when_pressed = self.button_callback(unicode, represented_key)
+
                 print("Panel was successfully detected")
+                self.buttons = buttons
                 return panel_detected, buttons
 
             # Return to menu if panel is not found
             except OSError:
                 panel_detected = False
                 print("Panel not detected")
+                self.buttons = buttons
                 return panel_detected, buttons
 
         # User chose keyboard to control the test
         else:
             panel_detected = False
 
+        self.buttons = buttons
         return panel_detected, buttons
 
-    def scan_for_pressed_buttons(self, buttons, panel_detected=False):
-        # Scan for buttons only if the control panel is being used to control the test
-        if panel_detected:
-            white_button = buttons['white_button']
-            yellow_button = buttons['yellow_button']
-            green_button = buttons['green_button']
-            blue_button = buttons['blue_button']
-            red_button = buttons['red_button']
-            up_button = buttons['up_button']
-            down_button = buttons['down_button']
-            left_pedal = buttons['left_pedal']
-            right_pedal = buttons['right_pedal']
-
-            # Check for button pressing
-            if white_button.is_pressed:
-                self.pressing_button("w", pygame.K_w)
-            if yellow_button.is_pressed:
-                self.pressing_button("y", pygame.K_y)
-            if green_button.is_pressed:
-                self.pressing_button("g", pygame.K_g)
-            if blue_button.is_pressed:
-                self.pressing_button("b", pygame.K_b)
-            if red_button.is_pressed:
-                self.pressing_button("r", pygame.K_r)
-            if up_button.is_pressed:
-                self.pressing_button(None, pygame.K_UP)
-            if down_button.is_pressed:
-                self.pressing_button(None, pygame.K_DOWN)
-            if left_pedal.is_pressed:
-                self.pressing_button(None, pygame.K_LEFT)
-            if right_pedal.is_pressed:
-                self.pressing_button(None, pygame.K_RIGHT)
-        else:
-            pass
+    # Release the pins of the control panel buttons (called when the test is left)
+    def close_input_device(self):
+        for button in self.buttons.values():
+            if button is not None:
+                button.close()
+        self.buttons = {}
+
+    # Callback of the button which queues its press together with the time of the press
+    def button_callback(self, unicode, represented_key):
+        def button_pressed():
+            # Runs in the callback thread of gpiozero (deque.append is thread-safe, no lock is needed)
+            self.button_presses.append((unicode, represented_key, self.timebase.now_ns()))
+        return button_pressed
+
+    # Post the queued button presses as key events, called by the test loop (see "wait_for_next_frame()")
+    def post_button_presses(self):
+        while self.button_presses:
+            unicode, represented_key, timestamp_ns = self.button_presses.popleft()
+            self.pressing_button(unicode, represented_key, timestamp_ns)
+
+    def get_events(self):
+        """
+        Returns the events of the input source (pygame.event.get() by default) without bounces of the switches.
+        A press of the same key within "debounce_time" after its last accepted press is dropped, presses of other
+        keys and the test loop itself are not delayed.
+        Every event carries the time of the input in "timestamp_ns", keyboard events carry no time, they are timed
+        on arrival.
+        """
+        now_ns = self.timebase.now_ns()
+        events = self.input_source.get(now_ns)
+        for event in events:
+            if getattr(event, 'timestamp_ns', None) is None:
+                event.timestamp_ns = now_ns
+        return [event for event in events if not self.is_bounce(event)]
+
+    def is_bounce(self, event):
+        if not event.type == pygame.KEYDOWN:
+            return False
+
+        last_press_time_ns = self.last_press_times.get(event.key)
+        if last_press_time_ns is not None and event.timestamp_ns - last_press_time_ns < self.debounce_time * 1000000000:
+            return True
 
-    # Define stimulus which is being presented during the test
+        self.last_press_times[event.key] = event.timestamp_ns
+        return False
+
+    # Discard every input waiting to be processed (including button presses not yet posted as key events)
+    def clear_input(self):
+        self.button_presses.clear()
+        self.input_source.clear()
+
+    # Time of the input since "time zero" of the test
+    def input_time_ns(self, event):
+        return event.timestamp_ns - self.timebase.epoch_ns
+
+    # Sprites are converted to the pixel format of the window, they are rendered again when the window changes
+    def build_sprite_atlas(self):
+        self.sprite_atlas = SpriteAtlas(self.color_scheme, self.stimulus_parameters,
+                                        self.stimulus_parameters['antialiased'])
+
+    # Define stimulus which is being presented during the test, returns the area of the screen it was drawn to
     def stimulus(self, stimulus_type, circle_position, sound_duration=1500):
 
-        # Color Circles
-        if stimulus_type in ['WHITE', 'GREEN', 'RED', 'YELLOW', 'BLUE']:
-            pygame.draw.circle(
-                self.main_window,
-                self.color_scheme[stimulus_type],
-                circle_position,
-                self.stimulus_parameters['circle_size'])
-
-        # Pedals
-        elif stimulus_type == "left_pedal":
-            pygame.draw.rect(self.main_window,
-                             (253, 253, 253),
-                             (50, int(self.main_window.get_height() - self.stimulus_parameters['pedal_height'] - 50),
-                              self.stimulus_parameters['pedal_width'],
-                              self.stimulus_parameters['pedal_height']))
-
-        elif stimulus_type == "right_pedal":
-            pygame.draw.rect(self.main_window,
-                             (253, 253, 253),
-                             (int(self.main_window.get_width() - self.stimulus_parameters['pedal_width'] - 50),
-                              int(self.main_window.get_height() - self.stimulus_parameters['pedal_height'] - 50),
-                              self.stimulus_parameters['pedal_width'],
-                              self.stimulus_parameters['pedal_height']))
+        # Color circles, pedals and arrows are pre-rendered sprites
+        if stimulus_type in self.sprite_atlas.sprites:
+            return self.main_window.blit(
+                self.sprite_atlas.sprites[stimulus_type],
+                self.sprite_atlas.rect(stimulus_type, circle_position, self.main_window.get_size()))
 
         # Sound
         elif stimulus_type in ['high_tone', 'low_tone']:
             self.sound_bank[stimulus_type].play(loops=0, maxtime=int(sound_duration), fade_ms=10)
 
-    def random_circle_position(self):
-        position = [random.randint(0 + self.stimulus_parameters['circle_size'] * 3,
-                                   self.main_window.get_width() - self.stimulus_parameters['circle_size'] * 3),
-                    random.randint(0 + self.stimulus_parameters['circle_size'] * 3,
-                                   self.main_window.get_height() - self.stimulus_parameters['circle_size'] * 3)]
-        return position
+    # Cover the displayed stimulus with the background, returns the area of the screen to update
+    def hide_stimulus(self, stimulus_rect):
+        # Window was resized, the whole screen is redrawn
+        if self.window_changed:
+            self.main_window.fill(self.color_scheme['GRAY'])
+            return self.main_window.get_rect()
+
+        if stimulus_rect is not None:
+            self.main_window.fill(self.color_scheme['GRAY'], stimulus_rect)
+        return stimulus_rect
+
+    # Send only the changed areas of the screen to the display (sounds have no area)
+    def update_display(self, dirty_rects):
+        if self.window_changed:
+            self.window_changed = False
+            pygame.display.flip()
+        else:
+            pygame.display.update([rect for rect in dirty_rects if rect is not None])
+
+    # Position of a circle in the current window from its relative position (0-1 on both axes)
+    def circle_position(self, relative_position):
+        margin = self.stimulus_parameters['circle_size'] * 3
+        return [round(margin + relative_position[0] * (self.main_window.get_width() - 2 * margin)),
+                round(margin + relative_position[1] * (self.main_window.get_height() - 2 * margin))]
 
     # Method that initialises recording of the answers for the upcoming test
     def record_answers(self, test_form):
         username = "Guest"
         score_id = None
 
+        # Answers are written into the User Database by a background thread
+        self.answer_recorder = AnswerRecorder()
+
         # Check if a user was given
         if self.current_user is not None:
             username = self.current_user.user_name
@@ -235,16 +451,13 @@ class TestEnvironment(ABC):
 
             # Record answers only for users tracked in User Table
             if user_in_database is not None:
-                # Connect to existing score table or create one
-                user_database.create_score_table()
-
-                # Connect to existing score table or create one
-                user_database.create_answer_table()
+                # Connect to existing tables or create them (and upgrade the database if needed)
+                user_database.connect()
 
                 # Make Score Table entry for the current test and return the ID of the current score
                 score_id = user_database.insert_into_score_table(
                     test_form,
-                    datetime.now().strftime("%d/%m/%Y %H:%M"),
+                    user_database.date_to_epoch_ms(datetime.now()),
                     self.current_user.user_id)
 
                 # Clean Score Table of any unwanted answers before recording
@@ -253,6 +466,11 @@ class TestEnvironment(ABC):
                 return username, score_id  # ID of the score which is going to receive answers from the test
         return username, score_id  # Returns None -> answers are not being recorded
 
+    # Method that writes all the queued answers into the User Database and stops the recorder
+    def stop_recording(self):
+        if self.answer_recorder is not None:
+            self.answer_recorder.close()
+
     def exit(self, phase, event, score_id):
         """
         Method that quits the test environment if "ESC" key or "close" button is pressed.
@@ -265,19 +483,27 @@ class TestEnvironment(ABC):
 
         # Closing the window by pressing X button on the window screen
         if event.type == pygame.QUIT:
+            # Write queued answers before deleting the score they belong to
+            self.stop_recording()
+
             # Delete unfinished test score
             if not phase == "Exit" and score_id is not None:
                 user_database.delete_score(score_id)
 
+            self.close_input_device()
             pygame.quit()
             return True
 
         # Closing the window by pressing ESC
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
+                # Write queued answers before deleting the score they belong to
+                self.stop_recording()
+
                 # Delete unfinished test score
                 if not phase == "Exit" and score_id is not None:
                     user_database.delete_score(score_id)
+                self.close_input_device()
                 pygame.quit()
                 return True
 
@@ -285,6 +511,9 @@ class TestEnvironment(ABC):
         if event.type == VIDEORESIZE:
             if not self.fullscreen:
                 self.main_window = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                self.text_cache = {}
+                self.build_sprite_atlas()
+                self.window_changed = True
 
         # Enter Fullscreen when pressing "f" on the keyboard
         if event.type == pygame.KEYDOWN:
@@ -299,6 +528,9 @@ class TestEnvironment(ABC):
                         (int(self.main_window.get_width() - 500),
                          int(self.main_window.get_height()) - 500),
                         pygame.RESIZABLE)
+                self.text_cache = {}
+                self.build_sprite_atlas()
+                self.window_changed = True
 
     # Method that starts the test
     @abstractmethod